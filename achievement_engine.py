@@ -0,0 +1,67 @@
+from bisect import bisect_right
+
+# How each counter an achievement can watch is read from a progress dict.
+# Keyed counters (per topic / per path) receive the key that changed; rules without a
+# "key" watch every key ("any topic", "any path").
+COUNTER_MEASURES = {
+    "articles_read": lambda user_data, key: user_data["articles_read"],
+    "summaries_generated": lambda user_data, key: user_data["summaries_generated"],
+    "daily_streak": lambda user_data, key: user_data["daily_streak"],
+    "topics_discovered": lambda user_data, key: len(user_data["topics_discovered"]),
+    "topic_count": lambda user_data, key: (user_data.get("topic_counts") or {}).get(key, 0),
+    "path_xp": lambda user_data, key: user_data["learning_paths"].get(key, {}).get("xp", 0),
+    "path_level": lambda user_data, key: user_data["learning_paths"].get(key, {}).get("current_level", 1),
+    "active_paths": lambda user_data, key: sum(1 for path_data in user_data["learning_paths"].values() if path_data["xp"] > 0)
+}
+
+class AchievementEngine:
+    """Achievement rules indexed by the counter they watch, so a change only evaluates affected rules"""
+
+    def __init__(self, achievements):
+        self.achievements = achievements
+        self._order = {achievement["id"]: position for position, achievement in enumerate(achievements)}
+
+        # {counter: {key or None: (sorted thresholds, achievements in the same order)}}
+        grouped = {}
+        for achievement in achievements:
+            counter = achievement["counter"]
+            if counter not in COUNTER_MEASURES:
+                raise ValueError(f"Achievement '{achievement['id']}' watches unknown counter '{counter}'")
+            grouped.setdefault(counter, {}).setdefault(achievement.get("key"), []).append(achievement)
+
+        self._index = {}
+        for counter, by_key in grouped.items():
+            self._index[counter] = {}
+            for key, rules in by_key.items():
+                rules.sort(key=lambda achievement: achievement["threshold"])
+                self._index[counter][key] = ([rule["threshold"] for rule in rules], rules)
+
+    def changes_for_entry(self, entry):
+        """Counters (with keys) that applying an XP ledger entry can change"""
+        if entry["activity"] == "article_read":
+            changes = [("articles_read", None), ("daily_streak", None)]
+            if entry.get("topic"):
+                changes += [("topic_count", entry["topic"]), ("topics_discovered", None)]
+            return changes
+        if entry["activity"] == "summary_generated":
+            return [("summaries_generated", None)]
+        return []
+
+    def evaluate(self, user_data, changes):
+        """Return achievements newly met after the given counter changes, in definition order"""
+        unlocked = set(user_data["achievements_unlocked"])
+        met = {}
+        for counter, key in changes:
+            by_key = self._index.get(counter)
+            if not by_key:
+                continue
+            value = COUNTER_MEASURES[counter](user_data, key)
+            for rule_key in {key, None}:
+                if rule_key not in by_key:
+                    continue
+                thresholds, rules = by_key[rule_key]
+                # Rules are sorted by threshold: only the prefix at or below the value is met
+                for achievement in rules[:bisect_right(thresholds, value)]:
+                    if achievement["id"] not in unlocked:
+                        met[achievement["id"]] = achievement
+        return sorted(met.values(), key=lambda achievement: self._order[achievement["id"]])
@@ -1,14 +1,24 @@
 import os
 import logging
-from flask import Flask, render_template, request, flash, redirect, url_for, jsonify
+from flask import Flask, render_template, request, flash, redirect, url_for, jsonify, Response, stream_with_context, session
+from flask.json.provider import DefaultJSONProvider
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from article import Article
 from news_service import NewsService
 from email_service import EmailService
 from summarizer_service import SummarizerService
 from mood_service import MoodService
 from gamification_service import GamificationService
+from progress_store import DEFAULT_USER_ID
+from response_cache import SerializedResponseCache, encode_json
+from render_cache import RenderCache
+import queue
 import atexit
+import json
+import uuid
+from datetime import datetime
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -18,17 +28,47 @@ load_dotenv()
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+class AppJSONProvider(DefaultJSONProvider):
+    """JSON provider that serializes Article records for jsonify and the tojson filter"""
+    
+    @staticmethod
+    def default(o):
+        if isinstance(o, Article):
+            return o.to_dict()
+        return DefaultJSONProvider.default(o)
+
 # Create Flask app
 app = Flask(__name__)
 app.secret_key = os.environ.get("SESSION_SECRET", "dev-secret-key-change-in-production")
+app.json = AppJSONProvider(app)
 
 # Initialize services
 news_service = NewsService()
 email_service = EmailService()
 summarizer_service = SummarizerService()
-mood_service = MoodService()
+mood_service = MoodService(article_store=news_service.store)
 gamification_service = GamificationService()
 
+# Encoded /api/articles and /api/mood bodies, rebuilt only when the article snapshot changes
+api_response_cache = SerializedResponseCache()
+
+# Rendered pages and fragments, keyed by article snapshot and progress versions
+render_cache = RenderCache()
+app.jinja_env.globals['cached_fragment'] = render_cache.fragment
+
+# Single-user mode shares the one "default" progress record (including progress imported
+# from the old user_progress.json) with every browser, as before per-user progress existed
+single_user_progress = os.getenv("PROGRESS_SINGLE_USER", "0") == "1"
+
+def current_user_id():
+    """Progress is tracked per browser session; new sessions get a random user id"""
+    if single_user_progress:
+        return DEFAULT_USER_ID
+    if 'user_id' not in session:
+        session['user_id'] = uuid.uuid4().hex
+        session.permanent = True
+    return session['user_id']
+
 # Initialize scheduler
 scheduler = BackgroundScheduler()
 
@@ -54,30 +94,64 @@ scheduler.add_job(
     replace_existing=True
 )
 
+def prefetch_news():
+    """Job function that keeps the article snapshot warm between user requests"""
+    news_service.prefetch_articles()
+
+# Refresh the article snapshot in the background when enabled; the first run warms the cache at startup
+if news_service.prefetch_enabled:
+    scheduler.add_job(
+        func=prefetch_news,
+        trigger=IntervalTrigger(seconds=news_service.prefetch_interval, jitter=news_service.prefetch_jitter),
+        id='prefetch_news_job',
+        name='Prefetch tech news',
+        next_run_time=datetime.now(),
+        max_instances=1,
+        coalesce=True,
+        replace_existing=True
+    )
+
+# Apply buffered gamification events in batches, off the request path
+scheduler.add_job(
+    func=gamification_service.flush_events,
+    trigger=IntervalTrigger(seconds=int(os.getenv("GAMIFICATION_FLUSH_INTERVAL", "5"))),
+    id='gamification_flush_job',
+    name='Flush gamification events',
+    max_instances=1,
+    coalesce=True,
+    replace_existing=True
+)
+
 # Start scheduler
 scheduler.start()
 
 # Shut down the scheduler when exiting the app
 atexit.register(lambda: scheduler.shutdown())
+# Registered last so it runs first: persist events still buffered at shutdown
+atexit.register(gamification_service.flush_events)
 
 @app.route('/')
 def dashboard():
     """Main dashboard showing latest news"""
     try:
-        articles, used_fallback = news_service.fetch_niche_tech_news()
+        articles, used_fallback, fetched_at = news_service.fetch_news_snapshot()
         if used_fallback:
             flash("⚠️ Showing fallback articles due to NewsAPI rate limit.", 'warning')
             logger.warning("Fallback articles used due to NewsAPI rate limit.")
-        return render_template('dashboard.html', articles=articles)
+        return render_cache.render_page(
+            ('dashboard', fetched_at),
+            lambda: (render_template('dashboard.html', articles=articles, snapshot_version=fetched_at), True)
+        )
     except Exception as e:
         logger.error(f"Error loading dashboard: {e}")
         flash(f"Error loading news: {str(e)}", 'danger')
-        return render_template('dashboard.html', articles=[])
+        return render_template('dashboard.html', articles=[], snapshot_version=None)
 
 @app.route('/refresh_news')
 def refresh_news():
     """Manually refresh news articles"""
     try:
+        news_service.invalidate_cache()
         articles, used_fallback = news_service.fetch_niche_tech_news()
         if used_fallback:
             flash("⚠️ Showing fallback articles due to NewsAPI rate limit.", 'warning')
@@ -139,12 +213,18 @@ def update_keywords():
 def news_mood():
     """News Mood dashboard showing trending topics and sentiment"""
     try:
-        articles, used_fallback = news_service.fetch_niche_tech_news()
+        articles, used_fallback, fetched_at = news_service.fetch_news_snapshot()
         if used_fallback:
             flash("⚠️ Showing fallback articles due to NewsAPI rate limit.", 'warning')
             logger.warning("Fallback articles used due to NewsAPI rate limit.")
-        mood_data = mood_service.analyze_news_mood(articles)
-        return render_template('mood.html', mood_data=mood_data, articles=articles)
+        
+        def build():
+            mood_data = mood_service.analyze_news_mood(articles)
+            html = render_template('mood.html', mood_data=mood_data, articles=articles)
+            # A degraded analysis is retried on the next view rather than pinned
+            return html, mood_service.is_cached(articles)
+        
+        return render_cache.render_page(('news_mood', fetched_at), build)
     except Exception as e:
         logger.error(f"Error loading mood dashboard: {e}")
         flash(f"Error loading mood data: {str(e)}", 'danger')
@@ -154,8 +234,16 @@ def news_mood():
 def learning_paths():
     """Gamified learning paths for XR/3D/Game development"""
     try:
-        learning_data = gamification_service.get_learning_dashboard_data()
-        return render_template('learning.html', learning_data=learning_data)
+        user_id = current_user_id()
+        # Show the user's own recent activity, merging in events not flushed yet without persisting them
+        pending_events = gamification_service.get_pending_events(user_id)
+        progress_version = (user_id, gamification_service.get_progress_version(user_id), len(pending_events))
+        
+        def build():
+            learning_data = gamification_service.get_learning_dashboard_data(user_id, pending_events)
+            return render_template('learning.html', learning_data=learning_data, progress_version=progress_version), True
+        
+        return render_cache.render_page(('learning_paths', progress_version), build)
     except Exception as e:
         logger.error(f"Error loading learning paths: {e}")
         flash(f"Error loading learning data: {str(e)}", 'danger')
@@ -165,19 +253,58 @@ def learning_paths():
 def api_articles():
     """API endpoint for fetching articles"""
     try:
-        articles, _ = news_service.fetch_niche_tech_news()
-        return jsonify({'success': True, 'articles': articles, 'count': len(articles)})
+        articles, _, fetched_at = news_service.fetch_news_snapshot()
+        encoded = api_response_cache.get_or_build(
+            'articles', fetched_at,
+            lambda: ({'success': True, 'articles': articles, 'count': len(articles)}, True),
+            last_modified=fetched_at
+        )
+        return api_response_cache.make_response(encoded, request)
     except Exception as e:
         logger.error(f"API error: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/articles/stream')
+def api_articles_stream():
+    """Server-Sent Events stream of newly ingested articles, fed by the refresh pipeline"""
+    last_event_id = request.headers.get('Last-Event-ID', '')
+    subscriber = news_service.broadcaster.subscribe(int(last_event_id) if last_event_id.isdigit() else None)
+    heartbeat = int(os.getenv("ARTICLE_STREAM_HEARTBEAT", "25"))
+    
+    def generate():
+        try:
+            yield "retry: 10000\n\n"
+            while True:
+                try:
+                    event_id, articles = subscriber.get(timeout=heartbeat)
+                except queue.Empty:
+                    # Comment line keeps proxies from closing an idle connection
+                    yield ": keepalive\n\n"
+                    continue
+                data = encode_json({'articles': articles, 'count': len(articles)}).decode('utf-8')
+                yield f"id: {event_id}\nevent: articles\ndata: {data}\n\n"
+        finally:
+            news_service.broadcaster.unsubscribe(subscriber)
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/api/mood')
 def api_mood():
     """API endpoint for mood analysis"""
     try:
-        articles, _ = news_service.fetch_niche_tech_news()
-        mood_data = mood_service.analyze_news_mood(articles)
-        return jsonify({'success': True, 'mood_data': mood_data})
+        articles, _, fetched_at = news_service.fetch_news_snapshot()
+        
+        def build():
+            mood_data = mood_service.analyze_news_mood(articles)
+            # A degraded analysis is not cached by MoodService, so don't pin its encoding either
+            return {'success': True, 'mood_data': mood_data}, mood_service.is_cached(articles)
+        
+        encoded = api_response_cache.get_or_build('mood', fetched_at, build, last_modified=fetched_at)
+        return api_response_cache.make_response(encoded, request)
     except Exception as e:
         logger.error(f"API mood error: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -190,10 +317,11 @@ def track_article_read():
         article_data = data.get('article', {})
         topic_category = data.get('topic_category')
         
-        user_data = gamification_service.get_user_progress()
-        result = gamification_service.track_article_read(user_data, article_data, topic_category)
+        result = gamification_service.track_article_read(current_user_id(), article_data, topic_category)
         
         return jsonify({'success': True, 'result': result})
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Error tracking article read: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -202,8 +330,7 @@ def track_article_read():
 def track_summary():
     """Track when user generates AI summary for gamification"""
     try:
-        user_data = gamification_service.get_user_progress()
-        result = gamification_service.track_summary_generated(user_data)
+        result = gamification_service.track_summary_generated(current_user_id())
         
         return jsonify({'success': True, 'result': result})
     except Exception as e:
@@ -231,7 +358,21 @@ def api_summarize():
         if not data or 'article' not in data:
             return jsonify({'success': False, 'error': 'Article data required'}), 400
         
-        article = data['article']
+        article = Article.from_dict(data['article'])
+        
+        # Stream takeaways as Server-Sent Events when the client asks for them
+        if request.args.get('stream') == '1' or 'text/event-stream' in request.headers.get('Accept', ''):
+            def generate():
+                for chunk in summarizer_service.stream_summary(article):
+                    yield f"data: {json.dumps({'text': chunk})}\n\n"
+                yield "event: done\ndata: {}\n\n"
+            
+            return Response(
+                stream_with_context(generate()),
+                mimetype='text/event-stream',
+                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+            )
+        
         summary = summarizer_service.summarize_article(article)
         
         return jsonify({
@@ -243,6 +384,25 @@ def api_summarize():
         logger.error(f"Error generating summary: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/summarize_batch', methods=['POST'])
+def api_summarize_batch():
+    """API endpoint for summarizing several articles in one Gemini call"""
+    try:
+        data = request.get_json()
+        if not data or not isinstance(data.get('articles'), list) or not data['articles']:
+            return jsonify({'success': False, 'error': 'Non-empty articles list required'}), 400
+        
+        summaries = summarizer_service.summarize_articles([Article.from_dict(article) for article in data['articles']])
+        
+        return jsonify({
+            'success': True,
+            'summaries': summaries,
+            'model': 'Gemini 2.5 Flash'
+        })
+    except Exception as e:
+        logger.error(f"Error generating batch summaries: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/test_gemini')
 def test_gemini():
     """Test Gemini AI integration"""
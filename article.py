@@ -0,0 +1,94 @@
+from datetime import datetime
+
+def format_published_date(published_date):
+    """Format a NewsAPI publication timestamp nicely"""
+    if not published_date:
+        return 'Unknown'
+    try:
+        dt = datetime.fromisoformat(published_date.replace('Z', '+00:00'))
+        return dt.strftime('%Y-%m-%d %H:%M')
+    except:
+        return published_date[:10]
+
+class Article:
+    """Compact article record; reads like the article dicts used by templates, JSON and services"""
+
+    __slots__ = (
+        'title', 'description', 'url', 'url_to_image', 'published_at',
+        'source', 'author', 'matched_keyword', '_formatted_date'
+    )
+
+    # Public dict keys mapped to attribute names
+    FIELDS = {
+        'title': 'title',
+        'description': 'description',
+        'url': 'url',
+        'urlToImage': 'url_to_image',
+        'publishedAt': 'published_at',
+        'source': 'source',
+        'author': 'author',
+        'matchedKeyword': 'matched_keyword'
+    }
+
+    def __init__(self, title, description=None, url=None, url_to_image=None, published_at=None,
+                 source=None, author=None, matched_keyword=None, formatted_date=None):
+        self.title = title
+        self.description = description
+        self.url = url
+        self.url_to_image = url_to_image
+        self.published_at = published_at
+        self.source = source or {}
+        self.author = author
+        self.matched_keyword = matched_keyword
+        self._formatted_date = formatted_date
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build an article from a NewsAPI-style dict (as stored, posted by the browser or in the fallback file)"""
+        if isinstance(data, cls):
+            return data
+        return cls(
+            title=data.get('title') or '',
+            description=data.get('description'),
+            url=data.get('url'),
+            url_to_image=data.get('urlToImage'),
+            published_at=data.get('publishedAt'),
+            source=data.get('source') if isinstance(data.get('source'), dict) else {},
+            author=data.get('author'),
+            matched_keyword=data.get('matchedKeyword'),
+            formatted_date=data.get('formattedDate')
+        )
+
+    @property
+    def formatted_date(self):
+        """Display date, parsed from publishedAt on first use and then cached"""
+        if self._formatted_date is None:
+            self._formatted_date = format_published_date(self.published_at)
+        return self._formatted_date
+
+    def get(self, key, default=None):
+        """dict.get-style access by public key"""
+        if key == 'formattedDate':
+            return self.formatted_date
+        attribute = self.FIELDS.get(key)
+        if attribute is None:
+            return default
+        value = getattr(self, attribute)
+        return default if value is None else value
+
+    def __getitem__(self, key):
+        if key != 'formattedDate' and key not in self.FIELDS:
+            raise KeyError(key)
+        return self.get(key)
+
+    def __contains__(self, key):
+        return key == 'formattedDate' or key in self.FIELDS
+
+    def to_dict(self):
+        """Plain dict for JSON responses and the browser"""
+        data = {key: getattr(self, attribute) for key, attribute in self.FIELDS.items()}
+        data['formattedDate'] = self.formatted_date
+        return data
+
+    def __repr__(self):
+        return f"Article({self.title!r}, url={self.url!r})"
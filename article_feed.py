@@ -0,0 +1,51 @@
+import os
+import queue
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+class ArticleBroadcaster:
+    """Fans newly ingested articles out to connected Server-Sent Events subscribers"""
+
+    def __init__(self, history_size=None, queue_size=None):
+        self.queue_size = queue_size or int(os.getenv("ARTICLE_STREAM_QUEUE_SIZE", "32"))
+        # Recent events are kept so reconnecting clients can catch up via Last-Event-ID
+        self.history = deque(maxlen=history_size or int(os.getenv("ARTICLE_STREAM_HISTORY", "50")))
+        self._subscribers = set()
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def subscribe(self, last_event_id=None):
+        """Register a subscriber; returns its queue, pre-filled with events missed since last_event_id"""
+        with self._lock:
+            missed = [event for event in self.history if event[0] > last_event_id] if last_event_id is not None else []
+            # The replay can be as long as the history, so room for it comes on top of the live queue
+            subscriber = queue.Queue(maxsize=self.queue_size + len(missed))
+            for event in missed:
+                subscriber.put_nowait(event)
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        """Remove a subscriber"""
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def publish(self, articles):
+        """Send a batch of new articles to every subscriber as one event"""
+        if not articles:
+            return
+        with self._lock:
+            event = (self._next_id, list(articles))
+            self._next_id += 1
+            self.history.append(event)
+            subscribers = list(self._subscribers)
+
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(event)
+            except queue.Full:
+                # A stalled client must not hold back the others; it catches up on reconnect
+                logger.warning("Dropping article event for a slow stream subscriber")
@@ -0,0 +1,179 @@
+import os
+import json
+import sqlite3
+import logging
+import threading
+import time
+from article import Article
+
+logger = logging.getLogger(__name__)
+
+class ArticleStore:
+    """SQLite-backed article store keyed by URL, with per-keyword high-water marks and per-article sentiment"""
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.getenv("ARTICLE_DB_PATH", "articles.db")
+        self._local = threading.local()
+        self._init_db()
+
+    def _connect(self):
+        """Return this thread's connection, opening it in WAL mode on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_db(self):
+        """Create tables and indexes if they do not exist yet"""
+        conn = self._connect()
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS articles (
+                    url TEXT PRIMARY KEY,
+                    title TEXT NOT NULL,
+                    description TEXT,
+                    url_to_image TEXT,
+                    published_at TEXT,
+                    formatted_date TEXT,
+                    source TEXT,
+                    author TEXT,
+                    matched_keyword TEXT,
+                    fetched_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_articles_published_at ON articles (published_at DESC)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS keyword_marks (
+                    keyword TEXT PRIMARY KEY,
+                    last_published_at TEXT NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS article_sentiment (
+                    article_key TEXT PRIMARY KEY,
+                    score REAL NOT NULL,
+                    label TEXT NOT NULL,
+                    themes TEXT,
+                    scored_at REAL NOT NULL
+                )
+            """)
+
+    def save_articles(self, articles):
+        """Insert articles not seen before and return the newly stored ones.
+
+        Each search's high-water mark advances in the same transaction, to the newest
+        article stored for it, so a failed save never skips articles on the next fetch.
+        """
+        conn = self._connect()
+        fetched_at = time.time()
+        new_articles = []
+        marks = {}
+        with conn:
+            for article in articles:
+                cursor = conn.execute(
+                    """INSERT OR IGNORE INTO articles
+                       (url, title, description, url_to_image, published_at, formatted_date,
+                        source, author, matched_keyword, fetched_at)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    (
+                        article.url,
+                        article.title,
+                        article.description,
+                        article.url_to_image,
+                        article.published_at,
+                        article.formatted_date,
+                        json.dumps(article.source or {}),
+                        article.author,
+                        article.matched_keyword,
+                        fetched_at
+                    )
+                )
+                if cursor.rowcount:
+                    new_articles.append(article)
+                if article.matched_keyword and article.published_at:
+                    marks[article.matched_keyword] = max(marks.get(article.matched_keyword, ''), article.published_at)
+            for keyword, published_at in marks.items():
+                self._advance_high_water_mark(conn, keyword, published_at)
+        return new_articles
+
+    def iter_recent_articles(self, limit=20):
+        """Yield the newest stored articles one row at a time, ordered by publication date"""
+        cursor = self._connect().execute(
+            "SELECT * FROM articles ORDER BY published_at DESC LIMIT ?", (limit,)
+        )
+        for row in cursor:
+            yield self._row_to_article(row)
+
+    def get_last_fetched_at(self):
+        """Return the time the most recent article was stored, or None for an empty store"""
+        row = self._connect().execute("SELECT MAX(fetched_at) FROM articles").fetchone()
+        return row[0]
+
+    def get_high_water_mark(self, keyword):
+        """Return the newest publishedAt stored for a keyword search, or None"""
+        row = self._connect().execute(
+            "SELECT last_published_at FROM keyword_marks WHERE keyword = ?", (keyword,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _advance_high_water_mark(self, conn, keyword, published_at):
+        """Advance a keyword's high-water mark inside the caller's transaction; older values never move it back"""
+        conn.execute(
+            """INSERT INTO keyword_marks (keyword, last_published_at) VALUES (?, ?)
+               ON CONFLICT(keyword) DO UPDATE SET last_published_at = excluded.last_published_at
+               WHERE excluded.last_published_at > keyword_marks.last_published_at""",
+            (keyword, published_at)
+        )
+
+    def get_sentiments(self, article_keys):
+        """Return stored per-article sentiment as {article_key: {'score', 'label', 'themes'}}"""
+        conn = self._connect()
+        sentiments = {}
+        keys = list(article_keys)
+        # Stay well below SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = conn.execute(
+                f"SELECT article_key, score, label, themes FROM article_sentiment WHERE article_key IN ({placeholders})",
+                chunk
+            ).fetchall()
+            for row in rows:
+                sentiments[row['article_key']] = {
+                    'score': row['score'],
+                    'label': row['label'],
+                    'themes': json.loads(row['themes']) if row['themes'] else []
+                }
+        return sentiments
+
+    def save_sentiments(self, sentiments):
+        """Persist per-article sentiment given as {article_key: {'score', 'label', 'themes'}}"""
+        conn = self._connect()
+        scored_at = time.time()
+        with conn:
+            conn.executemany(
+                """INSERT OR REPLACE INTO article_sentiment (article_key, score, label, themes, scored_at)
+                   VALUES (?, ?, ?, ?, ?)""",
+                [
+                    (key, value['score'], value['label'], json.dumps(value.get('themes') or []), scored_at)
+                    for key, value in sentiments.items()
+                ]
+            )
+
+    def _row_to_article(self, row):
+        """Convert a database row back into an Article"""
+        return Article(
+            title=row['title'],
+            description=row['description'],
+            url=row['url'],
+            url_to_image=row['url_to_image'],
+            published_at=row['published_at'],
+            source=json.loads(row['source']) if row['source'] else {},
+            author=row['author'],
+            matched_keyword=row['matched_keyword'],
+            formatted_date=row['formatted_date']
+        )
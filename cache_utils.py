@@ -0,0 +1,48 @@
+import time
+import threading
+from collections import OrderedDict
+
+class LRUCache:
+    """Thread-safe in-memory LRU cache with an optional per-entry TTL"""
+
+    def __init__(self, maxsize=256, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default if missing or expired"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            value, stored_at = item
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """Store value under key, evicting the least recently used entry when full"""
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        """Remove key and return its value"""
+        with self._lock:
+            item = self._data.pop(key, None)
+            return item[0] if item else default
+
+    def clear(self):
+        """Remove every entry"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
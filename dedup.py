@@ -0,0 +1,66 @@
+import re
+import random
+import zlib
+
+WORD_PATTERN = re.compile(r'[a-z0-9]+')
+
+# Large Mersenne prime for the universal hash family used by MinHash
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+class NearDuplicateDetector:
+    """Streaming near-duplicate detector using MinHash signatures and an LSH band index"""
+
+    def __init__(self, threshold=0.6, num_perm=64, bands=16, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        rng = random.Random(seed)
+        self._permutations = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)]
+        self._buckets = {}
+        self._signatures = {}
+
+    def shingles(self, text):
+        """Word bigrams of the normalized text (single words for very short text)"""
+        words = WORD_PATTERN.findall((text or '').lower())
+        if len(words) < 2:
+            return set(words)
+        return {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+    def signature(self, text):
+        """Compute the MinHash signature of a text"""
+        hashes = [zlib.crc32(shingle.encode("utf-8")) for shingle in self.shingles(text)]
+        if not hashes:
+            return None
+        return tuple(
+            min((a * h + b) % _PRIME & _MAX_HASH for h in hashes)
+            for a, b in self._permutations
+        )
+
+    def similarity(self, sig_a, sig_b):
+        """Estimate Jaccard similarity from two signatures"""
+        return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / self.num_perm
+
+    def check_and_add(self, key, text):
+        """Return the key of an already-seen near-duplicate, or record this text and return None"""
+        sig = self.signature(text)
+        if sig is None:
+            return None
+
+        band_keys = [(band, sig[band * self.rows:(band + 1) * self.rows]) for band in range(self.bands)]
+        checked = set()
+        for band_key in band_keys:
+            for candidate in self._buckets.get(band_key, ()):
+                if candidate in checked:
+                    continue
+                checked.add(candidate)
+                if self.similarity(sig, self._signatures[candidate]) >= self.threshold:
+                    return candidate
+
+        self._signatures[key] = sig
+        for band_key in band_keys:
+            self._buckets.setdefault(band_key, []).append(key)
+        return None
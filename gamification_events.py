@@ -0,0 +1,106 @@
+import os
+import logging
+import threading
+from collections import deque, defaultdict
+
+logger = logging.getLogger(__name__)
+
+class GamificationEventQueue:
+    """In-memory buffer of gamification events, applied to the progress store in batches.
+
+    Events leave the buffer only after their user's batch has committed. When a user's batch
+    fails, its events are retried one at a time so a bad event cannot hold back the others;
+    events that still fail are put back at the front for the next flush (at-least-once) and
+    dropped after max_attempts failed flushes.
+    """
+
+    def __init__(self, apply_events, capacity=None, batch_size=None, max_attempts=None):
+        self.apply_events = apply_events
+        self.capacity = capacity or int(os.getenv("GAMIFICATION_EVENT_BUFFER", "10000"))
+        self.batch_size = batch_size or int(os.getenv("GAMIFICATION_FLUSH_BATCH", "500"))
+        self.max_attempts = max_attempts or int(os.getenv("GAMIFICATION_MAX_ATTEMPTS", "3"))
+        self._events = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._results = defaultdict(list)
+        self.max_results = 20
+
+    def append(self, event):
+        """Queue an event; flushes inline only when the buffer is full"""
+        with self._lock:
+            self._events.append(event)
+            full = len(self._events) >= self.capacity
+        if full:
+            logger.warning("Gamification event buffer full; flushing inline")
+            self.flush()
+
+    def flush(self):
+        """Apply every queued event; returns the number of events persisted"""
+        applied = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = [self._events.popleft() for _ in range(min(self.batch_size, len(self._events)))]
+                if not batch:
+                    break
+
+                by_user = defaultdict(list)
+                for event in batch:
+                    by_user[event['user_id']].append(event)
+
+                failed_ids = set()
+                for user_id, events in by_user.items():
+                    try:
+                        self._store_results(user_id, self.apply_events(user_id, events))
+                        applied += len(events)
+                        continue
+                    except Exception as e:
+                        logger.error(f"Error applying {len(events)} gamification events for {user_id}: {e}")
+                    if len(events) == 1:
+                        failed_ids.add(id(events[0]))
+                        continue
+                    # Isolate the failing events so the user's other events still commit
+                    for event in events:
+                        try:
+                            self._store_results(user_id, self.apply_events(user_id, [event]))
+                            applied += 1
+                        except Exception as e:
+                            logger.error(f"Error applying gamification event for {user_id}: {e}")
+                            failed_ids.add(id(event))
+
+                if failed_ids:
+                    retry = []
+                    for event in batch:
+                        if id(event) not in failed_ids:
+                            continue
+                        event['attempts'] = event.get('attempts', 0) + 1
+                        if event['attempts'] >= self.max_attempts:
+                            logger.error(f"Dropping gamification event after {event['attempts']} failed attempts: {event}")
+                        else:
+                            retry.append(event)
+                    # Keep failed events at the front, in their original order, and retry on the next flush
+                    with self._lock:
+                        self._events.extendleft(reversed(retry))
+                    break
+        return applied
+
+    def _store_results(self, user_id, results):
+        """Keep an applied batch's results until the user's next tracked event collects them"""
+        if results:
+            with self._lock:
+                # Only the most recent results are kept for users who never collect them
+                self._results[user_id] = (self._results[user_id] + results)[-self.max_results:]
+
+    def pending(self, user_id):
+        """Return a user's queued events that have not been applied yet, oldest first"""
+        with self._lock:
+            return [event for event in self._events if event['user_id'] == user_id]
+
+    def pop_results(self, user_id):
+        """Return and clear the results of a user's applied events"""
+        with self._lock:
+            return self._results.pop(user_id, [])
+
+    def __len__(self):
+        with self._lock:
+            return len(self._events)
@@ -1,128 +1,159 @@
 import os
-import json
 import logging
-from datetime import datetime, timedelta
-from collections import defaultdict
+from bisect import bisect_right
+from datetime import datetime
+from itertools import accumulate
+from achievement_engine import AchievementEngine
+from gamification_events import GamificationEventQueue
+from progress_store import DEFAULT_USER_ID, create_progress_store
+from xp_ledger import apply_entry, make_entry
 
 logger = logging.getLogger(__name__)
 
+# Base XP awarded per tracked event type
+EVENT_XP = {"article_read": 5, "summary_generated": 3}
+
+# Learning paths for different XR/3D/Game development tracks; static, so built once per process
+LEARNING_PATHS = {
+    "ar_developer": {
+        "name": "AR Developer",
+        "description": "Master Augmented Reality development",
+        "icon": "smartphone",
+        "color": "primary",
+        "levels": [
+            {"level": 1, "title": "AR Basics", "xp_required": 0, "topics": ["AR fundamentals", "ARCore", "ARKit"]},
+            {"level": 2, "title": "AR Interactions", "xp_required": 100, "topics": ["Hand tracking", "Gesture recognition", "Spatial mapping"]},
+            {"level": 3, "title": "AR Applications", "xp_required": 250, "topics": ["AR games", "Industrial AR", "AR marketing"]},
+            {"level": 4, "title": "Advanced AR", "xp_required": 500, "topics": ["Computer vision", "SLAM", "AR cloud"]},
+            {"level": 5, "title": "AR Expert", "xp_required": 1000, "topics": ["AR research", "Custom AR engines", "AR leadership"]}
+        ]
+    },
+    "vr_developer": {
+        "name": "VR Developer",
+        "description": "Become a Virtual Reality expert",
+        "icon": "eye",
+        "color": "success",
+        "levels": [
+            {"level": 1, "title": "VR Fundamentals", "xp_required": 0, "topics": ["VR basics", "Unity VR", "Unreal VR"]},
+            {"level": 2, "title": "VR Interactions", "xp_required": 100, "topics": ["VR controllers", "Hand tracking", "Locomotion"]},
+            {"level": 3, "title": "VR Experiences", "xp_required": 250, "topics": ["VR games", "VR training", "Social VR"]},
+            {"level": 4, "title": "Advanced VR", "xp_required": 500, "topics": ["VR optimization", "Custom shaders", "VR physics"]},
+            {"level": 5, "title": "VR Master", "xp_required": 1000, "topics": ["VR research", "VR architecture", "VR innovation"]}
+        ]
+    },
+    "unity_developer": {
+        "name": "Unity Developer",
+        "description": "Master Unity game engine",
+        "icon": "box",
+        "color": "warning",
+        "levels": [
+            {"level": 1, "title": "Unity Basics", "xp_required": 0, "topics": ["Unity interface", "GameObjects", "Components"]},
+            {"level": 2, "title": "Unity Scripting", "xp_required": 100, "topics": ["C# basics", "MonoBehaviour", "Unity API"]},
+            {"level": 3, "title": "Game Development", "xp_required": 250, "topics": ["Game mechanics", "UI systems", "Audio"]},
+            {"level": 4, "title": "Advanced Unity", "xp_required": 500, "topics": ["Optimization", "Custom tools", "Networking"]},
+            {"level": 5, "title": "Unity Expert", "xp_required": 1000, "topics": ["Unity architecture", "Performance", "Team leadership"]}
+        ]
+    },
+    "blender_artist": {
+        "name": "3D Artist (Blender)",
+        "description": "Become a 3D modeling and animation expert",
+        "icon": "layers",
+        "color": "info",
+        "levels": [
+            {"level": 1, "title": "Blender Basics", "xp_required": 0, "topics": ["Blender interface", "Basic modeling", "Materials"]},
+            {"level": 2, "title": "3D Modeling", "xp_required": 100, "topics": ["Advanced modeling", "Sculpting", "Retopology"]},
+            {"level": 3, "title": "Animation", "xp_required": 250, "topics": ["Keyframe animation", "Rigging", "Character animation"]},
+            {"level": 4, "title": "Advanced 3D", "xp_required": 500, "topics": ["Geometry nodes", "Simulations", "Compositing"]},
+            {"level": 5, "title": "3D Master", "xp_required": 1000, "topics": ["Pipeline development", "3D innovation", "Teaching"]}
+        ]
+    },
+    "game_developer": {
+        "name": "Game Developer",
+        "description": "Create engaging games across platforms",
+        "icon": "play",
+        "color": "danger",
+        "levels": [
+            {"level": 1, "title": "Game Design", "xp_required": 0, "topics": ["Game mechanics", "Level design", "Player experience"]},
+            {"level": 2, "title": "Programming", "xp_required": 100, "topics": ["Game programming", "Engine basics", "Debug tools"]},
+            {"level": 3, "title": "Production", "xp_required": 250, "topics": ["Project management", "Team collaboration", "Publishing"]},
+            {"level": 4, "title": "Advanced Games", "xp_required": 500, "topics": ["AI systems", "Multiplayer", "Performance"]},
+            {"level": 5, "title": "Game Expert", "xp_required": 1000, "topics": ["Game architecture", "Industry trends", "Innovation"]}
+        ]
+    },
+    "xr_developer": {
+        "name": "XR Developer",
+        "description": "Build mixed reality and cross-platform XR experiences",
+        "icon": "globe",
+        "color": "dark",
+        "levels": [
+            {"level": 1, "title": "XR Fundamentals", "xp_required": 0, "topics": ["Mixed reality basics", "OpenXR", "WebXR"]},
+            {"level": 2, "title": "Cross-Platform XR", "xp_required": 100, "topics": ["Multi-device XR", "Shared experiences", "XR frameworks"]},
+            {"level": 3, "title": "XR Applications", "xp_required": 250, "topics": ["Enterprise XR", "Social XR", "XR for education"]},
+            {"level": 4, "title": "Advanced XR", "xp_required": 500, "topics": ["XR optimization", "Custom XR tools", "XR analytics"]},
+            {"level": 5, "title": "XR Expert", "xp_required": 1000, "topics": ["XR research", "XR platform development", "XR innovation"]}
+        ]
+    }
+}
+
+# Cumulative XP thresholds per path (index i = XP needed for level i + 1), for bisect lookups
+LEVEL_THRESHOLDS = {
+    path_id: list(accumulate((level["xp_required"] for level in path_info["levels"]), max))
+    for path_id, path_info in LEARNING_PATHS.items()
+}
+
+def level_for_xp(path_id, xp):
+    """Return the level a path's XP has reached, in O(log levels)"""
+    return max(1, bisect_right(LEVEL_THRESHOLDS[path_id], xp))
+
 class GamificationService:
-    def __init__(self):
+    def __init__(self, progress_store=None):
         """Initialize gamification service"""
-        self.user_data_file = "user_progress.json"
-        self.learning_paths = self._define_learning_paths()
+        # Per-user progress lives in a pluggable backend (SQLite by default)
+        self.progress_store = progress_store or create_progress_store()
+        
+        # Write-behind: tracked events are buffered and applied in batches by flush_events()
+        self.write_behind = os.getenv("GAMIFICATION_WRITE_BEHIND", "1") != "0"
+        self.event_queue = GamificationEventQueue(self.apply_events)
+        self.learning_paths = LEARNING_PATHS
         self.achievements = self._define_achievements()
+        self.achievement_engine = AchievementEngine(self.achievements)
         
-    def _define_learning_paths(self):
-        """Define learning paths for different XR/3D/Game development tracks"""
-        return {
-            "ar_developer": {
-                "name": "AR Developer",
-                "description": "Master Augmented Reality development",
-                "icon": "smartphone",
-                "color": "primary",
-                "levels": [
-                    {"level": 1, "title": "AR Basics", "xp_required": 0, "topics": ["AR fundamentals", "ARCore", "ARKit"]},
-                    {"level": 2, "title": "AR Interactions", "xp_required": 100, "topics": ["Hand tracking", "Gesture recognition", "Spatial mapping"]},
-                    {"level": 3, "title": "AR Applications", "xp_required": 250, "topics": ["AR games", "Industrial AR", "AR marketing"]},
-                    {"level": 4, "title": "Advanced AR", "xp_required": 500, "topics": ["Computer vision", "SLAM", "AR cloud"]},
-                    {"level": 5, "title": "AR Expert", "xp_required": 1000, "topics": ["AR research", "Custom AR engines", "AR leadership"]}
-                ]
-            },
-            "vr_developer": {
-                "name": "VR Developer",
-                "description": "Become a Virtual Reality expert",
-                "icon": "eye",
-                "color": "success",
-                "levels": [
-                    {"level": 1, "title": "VR Fundamentals", "xp_required": 0, "topics": ["VR basics", "Unity VR", "Unreal VR"]},
-                    {"level": 2, "title": "VR Interactions", "xp_required": 100, "topics": ["VR controllers", "Hand tracking", "Locomotion"]},
-                    {"level": 3, "title": "VR Experiences", "xp_required": 250, "topics": ["VR games", "VR training", "Social VR"]},
-                    {"level": 4, "title": "Advanced VR", "xp_required": 500, "topics": ["VR optimization", "Custom shaders", "VR physics"]},
-                    {"level": 5, "title": "VR Master", "xp_required": 1000, "topics": ["VR research", "VR architecture", "VR innovation"]}
-                ]
-            },
-            "unity_developer": {
-                "name": "Unity Developer",
-                "description": "Master Unity game engine",
-                "icon": "box",
-                "color": "warning",
-                "levels": [
-                    {"level": 1, "title": "Unity Basics", "xp_required": 0, "topics": ["Unity interface", "GameObjects", "Components"]},
-                    {"level": 2, "title": "Unity Scripting", "xp_required": 100, "topics": ["C# basics", "MonoBehaviour", "Unity API"]},
-                    {"level": 3, "title": "Game Development", "xp_required": 250, "topics": ["Game mechanics", "UI systems", "Audio"]},
-                    {"level": 4, "title": "Advanced Unity", "xp_required": 500, "topics": ["Optimization", "Custom tools", "Networking"]},
-                    {"level": 5, "title": "Unity Expert", "xp_required": 1000, "topics": ["Unity architecture", "Performance", "Team leadership"]}
-                ]
-            },
-            "blender_artist": {
-                "name": "3D Artist (Blender)",
-                "description": "Become a 3D modeling and animation expert",
-                "icon": "layers",
-                "color": "info",
-                "levels": [
-                    {"level": 1, "title": "Blender Basics", "xp_required": 0, "topics": ["Blender interface", "Basic modeling", "Materials"]},
-                    {"level": 2, "title": "3D Modeling", "xp_required": 100, "topics": ["Advanced modeling", "Sculpting", "Retopology"]},
-                    {"level": 3, "title": "Animation", "xp_required": 250, "topics": ["Keyframe animation", "Rigging", "Character animation"]},
-                    {"level": 4, "title": "Advanced 3D", "xp_required": 500, "topics": ["Geometry nodes", "Simulations", "Compositing"]},
-                    {"level": 5, "title": "3D Master", "xp_required": 1000, "topics": ["Pipeline development", "3D innovation", "Teaching"]}
-                ]
-            },
-            "game_developer": {
-                "name": "Game Developer",
-                "description": "Create engaging games across platforms",
-                "icon": "play",
-                "color": "danger",
-                "levels": [
-                    {"level": 1, "title": "Game Design", "xp_required": 0, "topics": ["Game mechanics", "Level design", "Player experience"]},
-                    {"level": 2, "title": "Programming", "xp_required": 100, "topics": ["Game programming", "Engine basics", "Debug tools"]},
-                    {"level": 3, "title": "Production", "xp_required": 250, "topics": ["Project management", "Team collaboration", "Publishing"]},
-                    {"level": 4, "title": "Advanced Games", "xp_required": 500, "topics": ["AI systems", "Multiplayer", "Performance"]},
-                    {"level": 5, "title": "Game Expert", "xp_required": 1000, "topics": ["Game architecture", "Industry trends", "Innovation"]}
-                ]
-            },
-            "xr_developer": {
-                "name": "XR Developer",
-                "description": "Build mixed reality and cross-platform XR experiences",
-                "icon": "globe",
-                "color": "dark",
-                "levels": [
-                    {"level": 1, "title": "XR Fundamentals", "xp_required": 0, "topics": ["Mixed reality basics", "OpenXR", "WebXR"]},
-                    {"level": 2, "title": "Cross-Platform XR", "xp_required": 100, "topics": ["Multi-device XR", "Shared experiences", "XR frameworks"]},
-                    {"level": 3, "title": "XR Applications", "xp_required": 250, "topics": ["Enterprise XR", "Social XR", "XR for education"]},
-                    {"level": 4, "title": "Advanced XR", "xp_required": 500, "topics": ["XR optimization", "Custom XR tools", "XR analytics"]},
-                    {"level": 5, "title": "XR Expert", "xp_required": 1000, "topics": ["XR research", "XR platform development", "XR innovation"]}
-                ]
-            }
-        }
-    
     def _define_achievements(self):
-        """Define achievements users can unlock"""
+        """Define achievements users can unlock.
+
+        Each one is met when its watched counter reaches the threshold; keyed counters
+        (topic_count, path_xp, path_level) take an optional "key", otherwise any key counts.
+        """
         return [
-            {"id": "first_read", "name": "News Explorer", "description": "Read your first XR article", "icon": "book-open", "xp": 10},
-            {"id": "daily_reader", "name": "Daily Reader", "description": "Read articles for 7 consecutive days", "icon": "calendar", "xp": 50},
-            {"id": "topic_master", "name": "Topic Master", "description": "Read 20 articles about a specific topic", "icon": "target", "xp": 100},
-            {"id": "trend_spotter", "name": "Trend Spotter", "description": "Discover 5 trending topics", "icon": "trending-up", "xp": 75},
-            {"id": "knowledge_seeker", "name": "Knowledge Seeker", "description": "Use AI summary 25 times", "icon": "brain", "xp": 60},
-            {"id": "tech_enthusiast", "name": "Tech Enthusiast", "description": "Read 100 total articles", "icon": "star", "xp": 200},
-            {"id": "learning_path", "name": "Path Starter", "description": "Begin a learning path", "icon": "map", "xp": 30},
-            {"id": "level_up", "name": "Level Up", "description": "Reach level 2 in any path", "icon": "arrow-up", "xp": 100},
-            {"id": "multi_path", "name": "Multi-Talented", "description": "Progress in 3 different learning paths", "icon": "shuffle", "xp": 150},
-            {"id": "expert", "name": "Expert", "description": "Reach level 5 in any path", "icon": "award", "xp": 500}
+            {"id": "first_read", "name": "News Explorer", "description": "Read your first XR article", "icon": "book-open", "xp": 10, "counter": "articles_read", "threshold": 1},
+            {"id": "daily_reader", "name": "Daily Reader", "description": "Read articles for 7 consecutive days", "icon": "calendar", "xp": 50, "counter": "daily_streak", "threshold": 7},
+            {"id": "topic_master", "name": "Topic Master", "description": "Read 20 articles about a specific topic", "icon": "target", "xp": 100, "counter": "topic_count", "threshold": 20},
+            {"id": "trend_spotter", "name": "Trend Spotter", "description": "Discover 5 trending topics", "icon": "trending-up", "xp": 75, "counter": "topics_discovered", "threshold": 5},
+            {"id": "knowledge_seeker", "name": "Knowledge Seeker", "description": "Use AI summary 25 times", "icon": "brain", "xp": 60, "counter": "summaries_generated", "threshold": 25},
+            {"id": "tech_enthusiast", "name": "Tech Enthusiast", "description": "Read 100 total articles", "icon": "star", "xp": 200, "counter": "articles_read", "threshold": 100},
+            {"id": "learning_path", "name": "Path Starter", "description": "Begin a learning path", "icon": "map", "xp": 30, "counter": "path_xp", "threshold": 1},
+            {"id": "level_up", "name": "Level Up", "description": "Reach level 2 in any path", "icon": "arrow-up", "xp": 100, "counter": "path_level", "threshold": 2},
+            {"id": "multi_path", "name": "Multi-Talented", "description": "Progress in 3 different learning paths", "icon": "shuffle", "xp": 150, "counter": "active_paths", "threshold": 3},
+            {"id": "expert", "name": "Expert", "description": "Reach level 5 in any path", "icon": "award", "xp": 500, "counter": "path_level", "threshold": 5}
         ]
     
-    def get_user_progress(self):
-        """Load user progress from file"""
+    def get_user_progress(self, user_id=DEFAULT_USER_ID):
+        """Load a user's progress from the progress store"""
         try:
-            if os.path.exists(self.user_data_file):
-                with open(self.user_data_file, 'r') as f:
-                    return json.load(f)
-            else:
-                return self._create_new_user()
+            user_data = self.progress_store.load(user_id)
+            return user_data if user_data is not None else self._create_new_user()
         except Exception as e:
             logger.error(f"Error loading user progress: {e}")
             return self._create_new_user()
     
+    def get_progress_version(self, user_id=DEFAULT_USER_ID):
+        """Version of a user's stored progress, used to key rendered pages"""
+        try:
+            return self.progress_store.get_version(user_id)
+        except Exception as e:
+            logger.error(f"Error reading progress version: {e}")
+            return None
+    
     def _create_new_user(self):
         """Create new user progress data"""
         return {
@@ -130,6 +161,7 @@ class GamificationService:
             "articles_read": 0,
             "summaries_generated": 0,
             "topics_discovered": [],
+            "topic_counts": {},
             "achievements_unlocked": [],
             "learning_paths": {path_id: {"current_level": 1, "xp": 0} for path_id in self.learning_paths.keys()},
             "daily_streak": 0,
@@ -137,73 +169,53 @@ class GamificationService:
             "created_date": datetime.now().isoformat()
         }
     
-    def save_user_progress(self, user_data):
-        """Save user progress to file"""
+    def save_user_progress(self, user_data, user_id=DEFAULT_USER_ID):
+        """Replace a user's stored progress"""
+        def replace(stored):
+            stored.clear()
+            stored.update(user_data)
+            return None, []
+        
         try:
-            with open(self.user_data_file, 'w') as f:
-                json.dump(user_data, f, indent=2)
+            self.progress_store.update(user_id, replace, self._create_new_user)
         except Exception as e:
             logger.error(f"Error saving user progress: {e}")
     
-    def award_xp(self, user_data, xp_amount, activity):
-        """Award XP to user and check for level ups and achievements"""
-        user_data["total_xp"] += xp_amount
-        logger.info(f"Awarded {xp_amount} XP for {activity}")
-        
-        # Check for new achievements
-        new_achievements = self._check_achievements(user_data)
+    def award_xp(self, user_data, entry):
+        """Apply an XP ledger entry, then check for level ups and achievements.
+
+        Returns (result, ledger entries), including entries for achievement bonuses.
+        """
+        apply_entry(user_data, entry)
+        logger.info(f"Awarded {entry['amount']} XP for {entry['activity']}")
+        entries = [entry]
         
         # Update learning path levels
         updated_paths = self._update_learning_paths(user_data)
         
+        # Check only the achievements watching counters this award changed
+        changes = self.achievement_engine.changes_for_entry(entry)
+        changes += [("path_level", level_up["path_id"]) for level_up in updated_paths]
+        new_achievements = self._check_achievements(user_data, changes, entries, entry["occurred_at"])
+        
         return {
-            "xp_awarded": xp_amount,
+            "xp_awarded": entry["amount"],
             "new_achievements": new_achievements,
             "level_ups": updated_paths
-        }
+        }, entries
     
-    def _check_achievements(self, user_data):
-        """Check if user has unlocked new achievements"""
-        new_achievements = []
+    def _check_achievements(self, user_data, changes, entries, occurred_at):
+        """Unlock achievements met after the given counter changes, recording their bonus XP in the ledger"""
+        new_achievements = self.achievement_engine.evaluate(user_data, changes)
         
-        for achievement in self.achievements:
-            if achievement["id"] not in user_data["achievements_unlocked"]:
-                if self._achievement_condition_met(achievement, user_data):
-                    user_data["achievements_unlocked"].append(achievement["id"])
-                    user_data["total_xp"] += achievement["xp"]
-                    new_achievements.append(achievement)
-                    logger.info(f"Achievement unlocked: {achievement['name']}")
+        for achievement in new_achievements:
+            entry = make_entry("achievement", achievement["xp"], occurred_at, achievement_id=achievement["id"])
+            apply_entry(user_data, entry)
+            entries.append(entry)
+            logger.info(f"Achievement unlocked: {achievement['name']}")
         
         return new_achievements
     
-    def _achievement_condition_met(self, achievement, user_data):
-        """Check if achievement condition is met"""
-        achievement_id = achievement["id"]
-        
-        if achievement_id == "first_read":
-            return user_data["articles_read"] >= 1
-        elif achievement_id == "daily_reader":
-            return user_data["daily_streak"] >= 7
-        elif achievement_id == "topic_master":
-            return any(count >= 20 for count in user_data.get("topic_counts", {}).values())
-        elif achievement_id == "trend_spotter":
-            return len(user_data["topics_discovered"]) >= 5
-        elif achievement_id == "knowledge_seeker":
-            return user_data["summaries_generated"] >= 25
-        elif achievement_id == "tech_enthusiast":
-            return user_data["articles_read"] >= 100
-        elif achievement_id == "learning_path":
-            return any(path_data["xp"] > 0 for path_data in user_data["learning_paths"].values())
-        elif achievement_id == "level_up":
-            return any(path_data["current_level"] >= 2 for path_data in user_data["learning_paths"].values())
-        elif achievement_id == "multi_path":
-            active_paths = sum(1 for path_data in user_data["learning_paths"].values() if path_data["xp"] > 0)
-            return active_paths >= 3
-        elif achievement_id == "expert":
-            return any(path_data["current_level"] >= 5 for path_data in user_data["learning_paths"].values())
-        
-        return False
-    
     def _update_learning_paths(self, user_data):
         """Update learning path levels based on XP"""
         level_ups = []
@@ -211,76 +223,111 @@ class GamificationService:
         for path_id, path_data in user_data["learning_paths"].items():
             if path_id in self.learning_paths:
                 path_info = self.learning_paths[path_id]
-                current_level = path_data["current_level"]
-                current_xp = path_data["xp"]
+                new_level = level_for_xp(path_id, path_data["xp"])
                 
-                # Check if user can level up
-                while current_level < len(path_info["levels"]):
-                    next_level_index = current_level  # 0-based index for next level
-                    if next_level_index < len(path_info["levels"]):
-                        required_xp = path_info["levels"][next_level_index]["xp_required"]
-                        if current_xp >= required_xp:
-                            current_level += 1
-                            path_data["current_level"] = current_level
-                            level_ups.append({
-                                "path": path_info["name"],
-                                "new_level": current_level,
-                                "level_title": path_info["levels"][current_level - 1]["title"],
-                                "next_topics": path_info["levels"][current_level - 1]["topics"] if current_level <= len(path_info["levels"]) else []
-                            })
-                        else:
-                            break
-                    else:
-                        break
+                # Levels never go down; report each level passed
+                for level in range(path_data["current_level"] + 1, new_level + 1):
+                    level_info = path_info["levels"][level - 1]
+                    level_ups.append({
+                        "path_id": path_id,
+                        "path": path_info["name"],
+                        "new_level": level,
+                        "level_title": level_info["title"],
+                        "next_topics": level_info["topics"]
+                    })
+                if new_level > path_data["current_level"]:
+                    path_data["current_level"] = new_level
         
         return level_ups
     
-    def track_article_read(self, user_data, article, topic_category=None):
-        """Track when user reads an article"""
-        user_data["articles_read"] += 1
-        
-        # Update daily streak
-        today = datetime.now().date()
-        last_active = user_data.get("last_active")
-        
-        if last_active:
-            last_date = datetime.fromisoformat(last_active).date()
-            if today == last_date:
-                pass  # Same day, no change
-            elif today == last_date + timedelta(days=1):
-                user_data["daily_streak"] += 1
-            else:
-                user_data["daily_streak"] = 1  # Reset streak
-        else:
-            user_data["daily_streak"] = 1
-        
-        user_data["last_active"] = datetime.now().isoformat()
-        
-        # Track topic
-        if topic_category:
-            if "topic_counts" not in user_data:
-                user_data["topic_counts"] = defaultdict(int)
-            user_data["topic_counts"][topic_category] += 1
-            
-            if topic_category not in user_data["topics_discovered"]:
-                user_data["topics_discovered"].append(topic_category)
+    def track_article_read(self, user_id, article, topic_category=None):
+        """Track when user reads an article; raises ValueError for a non-string topic_category"""
+        # Validate before queueing: a bad event would otherwise only fail at flush time
+        if topic_category is not None and not isinstance(topic_category, str):
+            raise ValueError("topic_category must be a string")
+        return self._track_event({
+            "type": "article_read",
+            "user_id": user_id,
+            "topic_category": topic_category,
+            "occurred_at": datetime.now().isoformat()
+        })
+    
+    def track_summary_generated(self, user_id):
+        """Track when user generates AI summary"""
+        return self._track_event({
+            "type": "summary_generated",
+            "user_id": user_id,
+            "occurred_at": datetime.now().isoformat()
+        })
+    
+    def _track_event(self, event):
+        """Queue an event (write-behind) or apply it in its own transaction"""
+        user_id = event["user_id"]
+        if not self.write_behind:
+            return self.progress_store.update(
+                user_id, lambda user_data: self._award_event(user_data, event), self._create_new_user
+            )
         
-        # Award XP and check achievements
-        result = self.award_xp(user_data, 5, "reading article")
-        self.save_user_progress(user_data)
+        self.event_queue.append(event)
+        # Achievements and level-ups from already-flushed events are reported with this response
+        new_achievements = []
+        level_ups = []
+        for result in self.event_queue.pop_results(user_id):
+            new_achievements.extend(result["new_achievements"])
+            level_ups.extend(result["level_ups"])
+        return {
+            "xp_awarded": EVENT_XP[event["type"]],
+            "new_achievements": new_achievements,
+            "level_ups": level_ups,
+            "queued": True
+        }
+    
+    def flush_events(self):
+        """Persist all buffered gamification events"""
+        applied = self.event_queue.flush()
+        if applied:
+            logger.info(f"Flushed {applied} gamification events")
+        return applied
+    
+    def apply_events(self, user_id, events):
+        """Apply a user's events in one progress store transaction; returns results worth reporting"""
+        def apply_all(user_data):
+            results = []
+            entries = []
+            for event in events:
+                result, event_entries = self._award_event(user_data, event)
+                results.append(result)
+                entries.extend(event_entries)
+            return results, entries
         
-        return result
+        results = self.progress_store.update(user_id, apply_all, self._create_new_user)
+        return [result for result in results if result["new_achievements"] or result["level_ups"]]
     
-    def track_summary_generated(self, user_data):
-        """Track when user generates AI summary"""
-        user_data["summaries_generated"] += 1
-        result = self.award_xp(user_data, 3, "generating AI summary")
-        self.save_user_progress(user_data)
-        return result
+    def _award_event(self, user_data, event):
+        """Turn one tracked event into an XP ledger entry and apply it to a user's progress"""
+        return self.award_xp(user_data, make_entry(
+            event["type"],
+            EVENT_XP[event["type"]],
+            event["occurred_at"],
+            topic=event.get("topic_category")
+        ))
+    
+    def get_pending_events(self, user_id=DEFAULT_USER_ID):
+        """Return a user's buffered events that have not been persisted yet"""
+        return self.event_queue.pending(user_id)
     
-    def get_learning_dashboard_data(self):
-        """Get comprehensive data for learning dashboard"""
-        user_data = self.get_user_progress()
+    def get_learning_dashboard_data(self, user_id=DEFAULT_USER_ID, pending_events=()):
+        """Get comprehensive data for learning dashboard.
+
+        pending_events are applied to the loaded progress in memory only, so the user sees
+        their latest activity without waiting for the write-behind flush.
+        """
+        user_data = self.get_user_progress(user_id)
+        for event in pending_events:
+            try:
+                self._award_event(user_data, event)
+            except Exception as e:
+                logger.error(f"Skipping unappliable pending gamification event: {e}")
         
         # Calculate user level based on total XP
         user_level = min(10, max(1, user_data["total_xp"] // 100 + 1))
@@ -289,20 +336,18 @@ class GamificationService:
         path_progress = {}
         for path_id, path_info in self.learning_paths.items():
             user_path_data = user_data["learning_paths"].get(path_id, {"current_level": 1, "xp": 0})
-            current_level = user_path_data["current_level"]
+            thresholds = LEVEL_THRESHOLDS[path_id]
+            current_level = min(
+                len(thresholds),
+                max(user_path_data["current_level"], level_for_xp(path_id, user_path_data["xp"]))
+            )
+            current_level_info = path_info["levels"][current_level - 1]
             
-            # Calculate progress to next level
-            if current_level <= len(path_info["levels"]):
-                current_level_info = path_info["levels"][current_level - 1]
-                if current_level < len(path_info["levels"]):
-                    next_level_info = path_info["levels"][current_level]
-                    progress_percent = min(100, (user_path_data["xp"] / next_level_info["xp_required"]) * 100)
-                    next_level_xp = next_level_info["xp_required"]
-                else:
-                    progress_percent = 100
-                    next_level_xp = None
+            # Calculate progress to next level from the precomputed thresholds
+            if current_level < len(thresholds):
+                next_level_xp = thresholds[current_level]
+                progress_percent = min(100, (user_path_data["xp"] / next_level_xp) * 100)
             else:
-                current_level_info = path_info["levels"][-1]
                 progress_percent = 100
                 next_level_xp = None
             
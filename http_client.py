@@ -0,0 +1,52 @@
+import os
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+_session = None
+_session_lock = threading.Lock()
+
+class CappedRetry(Retry):
+    """Retry policy that honors Retry-After but never sleeps longer than RETRY_AFTER_MAX seconds"""
+
+    RETRY_AFTER_MAX = float(os.getenv("HTTP_RETRY_AFTER_MAX", "30"))
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, self.RETRY_AFTER_MAX)
+
+def create_session():
+    """Create a requests session with pooled keep-alive connections and retry-with-backoff"""
+    retry = CappedRetry(
+        total=int(os.getenv("HTTP_RETRIES", "3")),
+        backoff_factor=float(os.getenv("HTTP_BACKOFF_FACTOR", "0.5")),
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(
+        pool_connections=int(os.getenv("HTTP_POOL_CONNECTIONS", "10")),
+        pool_maxsize=int(os.getenv("HTTP_POOL_MAXSIZE", "16")),
+        max_retries=retry
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def get_session():
+    """Return the process-wide pooled session, creating it on first use"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_session()
+                logger.info("Created pooled HTTP session")
+    return _session
@@ -0,0 +1,64 @@
+import re
+import json
+
+FENCE_PATTERN = re.compile(r'```(?:json|JSON)?\s*(.*?)(?:```|$)', re.DOTALL)
+
+JSON_START_PATTERN = re.compile(r'[\[{]')
+
+_decoder = json.JSONDecoder()
+
+def parse_json_response(text, validate=None):
+    """Extract a JSON value from model output that may be fenced, wrapped in prose or truncated.
+
+    validate(value) -> bool rejects values of the wrong shape, so bracketed prose such as
+    an echoed "[1] Title" is skipped in favour of a later JSON value.
+    """
+    if not text or not text.strip():
+        raise ValueError("Empty response from model")
+    validate = validate or (lambda value: True)
+
+    candidates = [text.strip()]
+    fenced = FENCE_PATTERN.search(text)
+    if fenced:
+        candidates.append(fenced.group(1).strip())
+
+    for candidate in candidates:
+        try:
+            value = json.loads(candidate)
+        except ValueError:
+            continue
+        if validate(value):
+            return value
+
+    # Fall back to the first valid JSON object or array embedded in the text
+    for candidate in candidates:
+        for match in JSON_START_PATTERN.finditer(candidate):
+            start = match.start()
+            try:
+                value, _ = _decoder.raw_decode(candidate, start)
+            except ValueError:
+                if candidate[start] != '[':
+                    continue
+                value = _salvage_array_items(candidate, start)
+                if not value:
+                    continue
+            if validate(value):
+                return value
+
+    raise ValueError("No JSON found in model response")
+
+def _salvage_array_items(text, start):
+    """Decode the complete leading items of a truncated JSON array"""
+    items = []
+    index = start + 1
+    while index < len(text):
+        while index < len(text) and text[index] in ' \t\r\n,':
+            index += 1
+        if index >= len(text) or text[index] == ']':
+            break
+        try:
+            item, index = _decoder.raw_decode(text, index)
+        except ValueError:
+            break
+        items.append(item)
+    return items
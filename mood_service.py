@@ -3,13 +3,79 @@ import logging
 import google.generativeai as genai
 import google.generativeai as genai
 import json
+import hashlib
 from collections import Counter
+from article import Article
+from article_store import ArticleStore
+from cache_utils import LRUCache
+from llm_output import parse_json_response
+from sentiment_lexicon import LexiconSentimentAnalyzer
+from text_matching import VocabularyMatcher
 
 logger = logging.getLogger(__name__)
 
+MOODS = ["positive", "negative", "neutral", "excited", "cautious"]
+
+# Structured output: ask Gemini for a JSON array matching this schema instead of free-form text
+SENTIMENT_GENERATION_CONFIG = {
+    'response_mime_type': 'application/json',
+    'response_schema': {
+        'type': 'array',
+        'items': {
+            'type': 'object',
+            'properties': {
+                'id': {'type': 'integer'},
+                'score': {'type': 'number'},
+                'mood': {'type': 'string', 'enum': MOODS},
+                'themes': {'type': 'array', 'items': {'type': 'string'}}
+            },
+            'required': ['id', 'score', 'mood']
+        }
+    }
+}
+
+# Common XR/3D keywords to look for
+TRENDING_KEYWORDS = [
+    'Unity', 'Blender', 'AR', 'VR', 'Meta Quest', 'Apple Vision',
+    'AI', 'Machine Learning', '3D Modeling', 'Game Development',
+    'WebXR', 'Mixed Reality', 'Spatial Computing', 'Neural Networks',
+    'OpenXR', 'USD', 'Metaverse', 'Digital Twin', 'Simulation'
+]
+
+TOPIC_CATEGORIES = {
+    'Unity Development': ['unity', 'unity3d', 'unity engine'],
+    'Blender/3D Art': ['blender', '3d modeling', '3d artist', '3d graphics'],
+    'AR Development': ['ar', 'augmented reality', 'arcore', 'arkit'],
+    'VR Development': ['vr', 'virtual reality', 'oculus', 'meta quest'],
+    'Game Development': ['game development', 'indie game', 'game engine'],
+    'AI/ML': ['artificial intelligence', 'machine learning', 'neural', 'ai']
+}
+
+# One compiled matcher feeds both the trending counts and the category distribution
+TOPIC_MATCHER = VocabularyMatcher({
+    'trending': {keyword: [keyword] for keyword in TRENDING_KEYWORDS},
+    'categories': TOPIC_CATEGORIES
+})
+
 class MoodService:
-    def __init__(self):
+    def __init__(self, article_store=None):
         """Initialize the mood analysis service with Gemini AI"""
+        # Per-article sentiment scores are persisted alongside the articles
+        self.article_store = article_store or ArticleStore()
+        self.score_batch_size = int(os.getenv("MOOD_SCORE_BATCH_SIZE", "25"))
+        
+        # Sentiment mode: "llm" (Gemini, lexicon fallback), "hybrid" (lexicon pre-filter,
+        # Gemini only for ambiguous articles) or "local" (lexicon only, no network)
+        self.analysis_mode = os.getenv("MOOD_ANALYSIS_MODE", "llm").lower()
+        self.lexicon = LexiconSentimentAnalyzer()
+        self.lexicon_confidence = float(os.getenv("MOOD_LEXICON_CONFIDENCE", "0.6"))
+        
+        # Mood results keyed by a fingerprint of the article set
+        self.mood_cache = LRUCache(
+            maxsize=int(os.getenv("MOOD_CACHE_SIZE", "32")),
+            ttl=int(os.getenv("MOOD_CACHE_TTL", "1800"))
+        )
+        
         try:
             api_key = os.environ.get("GEMINI_API_KEY")
             if not api_key:
@@ -23,105 +89,190 @@ class MoodService:
     
     def analyze_news_mood(self, articles):
         """Analyze the overall mood and trending topics from news articles"""
-        if not self.client:
-            logger.error("Gemini client not initialized")
-            return self._get_fallback_mood_data(articles)
-        
         if not articles or len(articles) == 0:
             return self._get_fallback_mood_data(articles)
         
+        articles = [Article.from_dict(article) for article in articles]
+        article_keys = [self._article_key(article) for article in articles]
+        fingerprint = self._fingerprint(article_keys)
+        cached_mood = self.mood_cache.get(fingerprint)
+        if cached_mood:
+            return dict(cached_mood)
+        
         try:
-            # Extract titles and descriptions for analysis
-            article_texts = []
-            for article in articles:
-                title = article.get('title', '')
-                description = article.get('description', '')
-                if title:
-                    article_texts.append(f"Title: {title}")
-                if description:
-                    article_texts.append(f"Description: {description}")
-            
-            if not article_texts:
-                return self._get_fallback_mood_data(articles)
-            
-            # Combine texts for analysis
-            combined_text = "\n".join(article_texts[:20])  # Limit to first 20 to avoid token limits
-            
-            # Analyze mood and trends
-            mood_data = self._analyze_sentiment_and_trends(combined_text)
-            
-            # Add article count and trending topics
+            # Each article is scanned once for trending keywords and categories
+            topic_matches = self._match_topics(articles)
+            themes_by_key = {key: matches['trending'][:3] for key, matches in zip(article_keys, topic_matches)}
+            
+            use_llm = self.client is not None and self.analysis_mode != 'local'
+            if self.client is None and self.analysis_mode != 'local':
+                logger.warning("Gemini client not initialized; using local sentiment analysis")
+            
+            # Stored Gemini scores are reused; only unscored articles need work
+            sentiments = self.article_store.get_sentiments(set(article_keys)) if use_llm else {}
+            unscored = [article for article, key in zip(articles, article_keys) if key not in sentiments]
+            local_scores = dict(zip(
+                (self._article_key(article) for article in unscored),
+                self.lexicon.score_articles(unscored)
+            ))
+            
+            llm_candidates = []
+            if use_llm and unscored:
+                llm_candidates = unscored
+                if self.analysis_mode == 'hybrid':
+                    # The lexicon settles clear-cut articles; only ambiguous ones cost a Gemini call
+                    llm_candidates = [
+                        article for article in unscored
+                        if abs(local_scores[self._article_key(article)]['score']) < self.lexicon_confidence
+                    ]
+                new_sentiments = self._score_articles(llm_candidates) if llm_candidates else {}
+                if new_sentiments:
+                    self.article_store.save_sentiments(new_sentiments)
+                    sentiments.update(new_sentiments)
+            
+            # Gemini was asked but did not answer for some articles
+            unanswered = sum(1 for article in llm_candidates if self._article_key(article) not in sentiments)
+            degraded = unanswered > 0
+            
+            # Anything still unscored (local mode, hybrid pre-filter or Gemini failure) uses the lexicon
+            for key, local_score in local_scores.items():
+                if key not in sentiments:
+                    sentiments[key] = dict(local_score, themes=themes_by_key.get(key, []))
+            
+            scores = [sentiments[key] for key in article_keys]
+            mood_data = self._aggregate_sentiment(scores, len(articles) - unanswered)
+            
             mood_data['total_articles'] = len(articles)
-            mood_data['trending_topics'] = self._extract_trending_topics(articles)
-            mood_data['topic_analysis'] = self._analyze_topic_distribution(articles)
+            mood_data['trending_topics'] = self._extract_trending_topics(articles, topic_matches)
+            mood_data['topic_analysis'] = self._analyze_topic_distribution(articles, topic_matches)
             
+            # Don't pin a lexicon fallback in the cache when Gemini was expected to answer
+            if not degraded:
+                self.mood_cache.set(fingerprint, dict(mood_data))
             return mood_data
             
         except Exception as e:
             logger.error(f"Error analyzing news mood: {e}")
             return self._get_fallback_mood_data(articles)
     
-    def _analyze_sentiment_and_trends(self, text):
-        """Use Gemini to analyze sentiment and overall mood"""
-        try:
-            prompt = f"""
-            Analyze the overall sentiment and mood of these XR/AR/VR/3D development news articles.
+    def is_cached(self, articles):
+        """Whether a full (non-degraded) mood analysis for this article set is cached"""
+        fingerprint = self._fingerprint(self._article_key(Article.from_dict(article)) for article in articles)
+        return self.mood_cache.get(fingerprint) is not None
+    
+    def _score_articles(self, articles):
+        """Score each article's sentiment with Gemini, in batches; returns {article_key: sentiment}"""
+        sentiments = {}
+        for start in range(0, len(articles), self.score_batch_size):
+            batch = articles[start:start + self.score_batch_size]
+            try:
+                sentiments.update(self._score_batch(batch))
+            except Exception as e:
+                logger.error(f"Error in sentiment analysis: {e}")
+        logger.info(f"Scored sentiment for {len(sentiments)} of {len(articles)} new articles")
+        return sentiments
+    
+    def _score_batch(self, articles):
+        """Ask Gemini for one sentiment score per article in a single call"""
+        article_texts = []
+        for index, article in enumerate(articles, 1):
+            title = article.title
+            description = (article.description or '')[:300]
+            article_texts.append(f"[{index}] Title: {title}\nDescription: {description}")
+        
+        prompt = f"""
+            Analyze the sentiment of each of these XR/AR/VR/3D development news articles.
             
-            Article content:
-            {text}
+            Articles:
+            {chr(10).join(article_texts)}
             
-            Please provide analysis in JSON format with:
-            1. mood: one of ["positive", "negative", "neutral", "excited", "cautious"]
-            2. confidence: float between 0 and 1
-            3. mood_description: brief explanation of the overall mood
-            4. key_themes: list of 3-5 main themes or topics detected
+            Respond with a JSON array containing one object per article with:
+            1. id: the article number in square brackets
+            2. score: float between -1 (very negative) and 1 (very positive)
+            3. mood: one of {json.dumps(MOODS)}
+            4. themes: list of 1-3 short themes or topics in the article
             
             Focus on technology trends, developer sentiment, industry outlook, and innovation pace.
             """
-            
-            response = self.client.generate_content(prompt)
-            
-            if response.text:
-                result = json.loads(response.text)
-                return {
-                    'mood': result.get('mood', 'neutral'),
-                    'confidence': float(result.get('confidence', 0.5)),
-                    'mood_description': result.get('mood_description', 'Mixed sentiment in technology news'),
-                    'key_themes': result.get('key_themes', [])
-                }
-            else:
-                raise ValueError("Empty response from Gemini")
-                
-        except Exception as e:
-            logger.error(f"Error in sentiment analysis: {e}")
-            return {
-                'mood': 'neutral',
-                'confidence': 0.5,
-                'mood_description': 'Unable to analyze mood - using neutral sentiment',
-                'key_themes': []
+        
+        response = self.client.generate_content(prompt, generation_config=SENTIMENT_GENERATION_CONFIG)
+        
+        result = parse_json_response(response.text, validate=self._is_sentiment_payload)
+        if isinstance(result, dict):
+            # Tolerate a single object or an object wrapping the list
+            result = next((value for value in result.values() if isinstance(value, list)), [result])
+        
+        sentiments = {}
+        for item in result:
+            if not isinstance(item, dict):
+                continue
+            try:
+                index = int(item.get('id')) - 1
+                score = float(item.get('score', 0))
+            except (TypeError, ValueError):
+                continue
+            if not 0 <= index < len(articles):
+                continue
+            mood = item.get('mood') if item.get('mood') in MOODS else 'neutral'
+            sentiments[self._article_key(articles[index])] = {
+                'score': max(-1.0, min(1.0, score)),
+                'label': mood,
+                'themes': [str(theme) for theme in (item.get('themes') or [])][:3]
             }
+        return sentiments
+    
+    def _is_sentiment_payload(self, value):
+        """A list of per-article objects, or an object (single result or wrapper of the list)"""
+        if isinstance(value, dict):
+            return True
+        return isinstance(value, list) and bool(value) and all(isinstance(item, dict) for item in value)
+    
+    def _aggregate_sentiment(self, scores, covered_articles):
+        """Combine per-article scores into page-level mood, confidence and key themes.
+
+        covered_articles counts the scores that came from their intended analyser; lexicon
+        stand-ins for articles Gemini failed to score are not covered.
+        """
+        label_counts = Counter(score['label'] for score in scores)
+        mood, mood_count = label_counts.most_common(1)[0]
+        average = sum(score['score'] for score in scores) / len(scores)
+        
+        # Confidence is the share of articles agreeing with the mood, scaled by coverage
+        coverage = covered_articles / len(scores)
+        confidence = round((mood_count / len(scores)) * coverage, 2)
+        
+        theme_counts = Counter(theme for score in scores for theme in score['themes'])
+        return {
+            'mood': mood,
+            'confidence': confidence,
+            'mood_description': f"{mood_count} of {len(scores)} analyzed articles read as {mood} (average sentiment {average:+.2f})",
+            'key_themes': [theme for theme, _ in theme_counts.most_common(5)]
+        }
     
-    def _extract_trending_topics(self, articles):
+    def _article_key(self, article):
+        """Identify an article by URL, falling back to its title"""
+        return article.url or article.title or ''
+    
+    def _fingerprint(self, article_keys):
+        """Stable fingerprint of an article set, independent of order"""
+        return hashlib.sha1("\n".join(sorted(set(article_keys))).encode("utf-8")).hexdigest()
+    
+    def _match_topics(self, articles):
+        """Scan each article's title and description once for trending keywords and categories"""
+        return [
+            TOPIC_MATCHER.scan(f"{article.title or ''} {article.description or ''}")
+            for article in articles
+        ]
+    
+    def _extract_trending_topics(self, articles, topic_matches=None):
         """Extract trending topics from article titles"""
         try:
-            # Common XR/3D keywords to look for
-            keywords = [
-                'Unity', 'Blender', 'AR', 'VR', 'Meta Quest', 'Apple Vision',
-                'AI', 'Machine Learning', '3D Modeling', 'Game Development',
-                'WebXR', 'Mixed Reality', 'Spatial Computing', 'Neural Networks',
-                'OpenXR', 'USD', 'Metaverse', 'Digital Twin', 'Simulation'
-            ]
+            if topic_matches is None:
+                topic_matches = self._match_topics(articles)
             
             keyword_counts = Counter()
-            
-            for article in articles:
-                title = article.get('title', '').lower()
-                description = article.get('description', '').lower()
-                combined = f"{title} {description}"
-                
-                for keyword in keywords:
-                    if keyword.lower() in combined:
-                        keyword_counts[keyword] += 1
+            for matches in topic_matches:
+                keyword_counts.update(matches['trending'])
             
             # Return top trending topics (mentioned in multiple articles)
             trending = [keyword for keyword, count in keyword_counts.most_common(10) if count >= 1]
@@ -131,32 +282,20 @@ class MoodService:
             logger.error(f"Error extracting trending topics: {e}")
             return []
     
-    def _analyze_topic_distribution(self, articles):
+    def _analyze_topic_distribution(self, articles, topic_matches=None):
         """Analyze the distribution of different technology topics"""
         try:
-            topic_categories = {
-                'Unity Development': ['unity', 'unity3d', 'unity engine'],
-                'Blender/3D Art': ['blender', '3d modeling', '3d artist', '3d graphics'],
-                'AR Development': ['ar', 'augmented reality', 'arcore', 'arkit'],
-                'VR Development': ['vr', 'virtual reality', 'oculus', 'meta quest'],
-                'Game Development': ['game development', 'indie game', 'game engine'],
-                'AI/ML': ['artificial intelligence', 'machine learning', 'neural', 'ai']
-            }
+            if topic_matches is None:
+                topic_matches = self._match_topics(articles)
             
-            topic_counts = {category: 0 for category in topic_categories.keys()}
+            topic_counts = {category: 0 for category in TOPIC_CATEGORIES.keys()}
             total_matches = 0
             
-            for article in articles:
-                title = article.get('title', '').lower()
-                description = article.get('description', '').lower()
-                combined = f"{title} {description}"
-                
-                for category, keywords in topic_categories.items():
-                    for keyword in keywords:
-                        if keyword in combined:
-                            topic_counts[category] += 1
-                            total_matches += 1
-                            break  # Count each article only once per category
+            # scan() reports each category at most once per article
+            for matches in topic_matches:
+                for category in matches['categories']:
+                    topic_counts[category] += 1
+                    total_matches += 1
             
             # Calculate percentages
             topic_analysis = []
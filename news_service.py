@@ -1,18 +1,109 @@
 import os
-import requests
 import logging
 from datetime import datetime
 import time
 import json
+import threading
+import heapq
+from article import Article
+from article_feed import ArticleBroadcaster
+from article_store import ArticleStore
+from dedup import NearDuplicateDetector
+from http_client import get_session
+from concurrent.futures import Future, ThreadPoolExecutor
 
 logger = logging.getLogger(__name__)
 
+
+class NewsAPIRateLimitError(Exception):
+    """Raised when NewsAPI answers with HTTP 429"""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Thread-safe token bucket used to space out NewsAPI calls"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then consume it"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
 class NewsService:
     def __init__(self):
         self.api_key = os.getenv("NEWS_API_KEY")
         self.base_url = "https://newsapi.org/v2/everything"
         self.keywords = "('AR' OR 'VR' OR 'MR' OR 'XR') AND ('3D Modeling' OR 'Game Development' OR Unity OR Blender OR 'Meta Quest' OR 'Graphics Design')"
         
+        # Define specific keyword combinations for targeted searches
+        self.keyword_searches = [
+            '"AR development" OR "augmented reality development"',
+            '"VR development" OR "virtual reality development"', 
+            '"Unity 3D" OR "Unity engine" OR "Unity development"',
+            '"Blender 3D" OR "Blender modeling" OR "Blender tutorial"',
+            '"Meta Quest" OR "Oculus Quest" OR "VR headset"',
+            '"3D modeling" OR "3D design" OR "3D graphics"',
+            '"game development" OR "indie game" OR "game engine"',
+            '"graphics design" OR "3D artist" OR "digital art"'
+        ]
+        
+        # Concurrent fetch settings: worker count and requests/second budget
+        self.max_concurrency = int(os.getenv("NEWS_FETCH_CONCURRENCY", "8"))
+        self.rate_limiter = TokenBucket(
+            rate=float(os.getenv("NEWS_API_RATE_PER_SEC", "5")),
+            capacity=int(os.getenv("NEWS_API_BURST", "8"))
+        )
+        
+        # Article cache shared by every route: fresh for cache_ttl seconds, then served
+        # stale for up to cache_stale_ttl more seconds while a refresh runs in the background
+        self.cache_ttl = int(os.getenv("NEWS_CACHE_TTL", "900"))
+        self.cache_stale_ttl = int(os.getenv("NEWS_CACHE_STALE_TTL", "3600"))
+        self._cache = {}
+        self._inflight = {}
+        self._cache_lock = threading.Lock()
+        
+        # Persistent article store: survives restarts and drives incremental "from=" queries
+        self.store = ArticleStore()
+        self._seeded_from_store = False
+        
+        # Newly ingested articles are pushed to /api/articles/stream subscribers
+        self.broadcaster = ArticleBroadcaster()
+        
+        # Near-duplicate clustering of syndicated stories before the top articles are chosen
+        self.max_articles = 20
+        self.dedup_threshold = float(os.getenv("NEWS_DEDUP_THRESHOLD", "0.6"))
+        self.dedup_candidate_factor = int(os.getenv("NEWS_DEDUP_CANDIDATE_FACTOR", "5"))
+        
+        # Background prefetch (opt-in): when enabled, request handlers only read the published
+        # snapshot and the scheduler job keeps it warm, backing off after a 429. Each run costs
+        # one call per keyword search, so the default interval stays within a 100 calls/day quota
+        self.prefetch_enabled = os.getenv("NEWS_PREFETCH", "0") == "1"
+        self.prefetch_interval = int(os.getenv("NEWS_PREFETCH_INTERVAL", "10800"))
+        self.prefetch_jitter = int(os.getenv("NEWS_PREFETCH_JITTER", "60"))
+        self.prefetch_max_backoff = int(os.getenv("NEWS_PREFETCH_MAX_BACKOFF", "21600"))
+        self.last_fetch_rate_limited = False
+        self.last_retry_after = None
+        self._backoff_seconds = 0
+        self._backoff_until = 0
+        
     def get_keywords(self):
         """Get current search keywords"""
         return self.keywords
@@ -23,104 +114,268 @@ class NewsService:
         logger.info(f"Keywords updated to: {keywords}")
     
     def fetch_niche_tech_news(self, page_size=5):
+        """Return cached articles, refreshing from NewsAPI when the cache has expired"""
+        articles, used_fallback, _ = self.fetch_news_snapshot(page_size)
+        return articles, used_fallback
+    
+    def fetch_news_snapshot(self, page_size=5):
+        """Like fetch_niche_tech_news, but also return the snapshot's fetch time (its version)"""
+        with self._cache_lock:
+            entry = self._cache.get(page_size)
+        
+        if entry is None and not self._seeded_from_store:
+            entry = self._load_snapshot_from_store(page_size)
+        
+        if entry:
+            articles, used_fallback, fetched_at = entry
+            if self.prefetch_enabled:
+                # The prefetch job owns refreshing; never block a request on the network
+                return list(articles), used_fallback, fetched_at
+            age = time.time() - fetched_at
+            if age < self.cache_ttl:
+                return list(articles), used_fallback, fetched_at
+            if age < self.cache_ttl + self.cache_stale_ttl:
+                # Serve the stale copy and revalidate in the background
+                self._refresh_in_background(page_size)
+                return list(articles), used_fallback, fetched_at
+        
+        articles, used_fallback, fetched_at = self._refresh_cache(page_size)
+        return list(articles), used_fallback, fetched_at
+    
+    def _load_snapshot_from_store(self, page_size):
+        """Seed the cache from the article store so a restarted process does not start cold"""
+        self._seeded_from_store = True
+        articles = self._select_top_articles()
+        if not articles:
+            return None
+        entry = (articles, False, self.store.get_last_fetched_at() or 0)
+        with self._cache_lock:
+            self._cache.setdefault(page_size, entry)
+        logger.info(f"Loaded {len(articles)} articles from the article store")
+        return entry
+    
+    def invalidate_cache(self):
+        """Drop all cached articles so the next fetch goes to NewsAPI"""
+        with self._cache_lock:
+            self._cache.clear()
+            # Store seeding is only for a cold start; after an invalidation it would just reload the old snapshot
+            self._seeded_from_store = True
+        logger.info("Article cache invalidated")
+    
+    def _refresh_cache(self, page_size):
+        """Fetch live articles and store them, sharing one upstream fetch between concurrent callers"""
+        with self._cache_lock:
+            future = self._inflight.get(page_size)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                self._inflight[page_size] = future
+        
+        if not is_owner:
+            return future.result()
+        
+        try:
+            articles, used_fallback = self._fetch_live_articles(page_size)
+            with self._cache_lock:
+                previous = self._cache.get(page_size)
+                if used_fallback and previous and not previous[1]:
+                    # Keep serving the last live snapshot rather than replacing it with fallback data
+                    articles, used_fallback = previous[0], False
+                    logger.warning("Live fetch returned nothing; keeping previous article snapshot")
+                entry = (articles, used_fallback, time.time())
+                self._cache[page_size] = entry
+            future.set_result(entry)
+            return entry
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._cache_lock:
+                self._inflight.pop(page_size, None)
+    
+    def _refresh_in_background(self, page_size):
+        """Start a background revalidation unless one is already running"""
+        with self._cache_lock:
+            if page_size in self._inflight:
+                return
+        
+        def revalidate():
+            try:
+                self._refresh_cache(page_size)
+            except Exception as e:
+                logger.error(f"Background article refresh failed: {e}")
+        
+        threading.Thread(target=revalidate, name="news-cache-refresh", daemon=True).start()
+    
+    def prefetch_articles(self, page_size=5):
+        """Refresh the article snapshot ahead of user requests, backing off after NewsAPI 429s"""
+        now = time.time()
+        if now < self._backoff_until:
+            logger.info(f"Skipping article prefetch, backing off for {int(self._backoff_until - now)}s after rate limit")
+            return False
+        
+        try:
+            self._refresh_cache(page_size)
+        except Exception as e:
+            logger.error(f"Article prefetch failed: {e}")
+            return False
+        
+        if self.last_fetch_rate_limited:
+            self._backoff_seconds = min(self.prefetch_max_backoff, max(self.prefetch_interval, self._backoff_seconds * 2))
+            if self.last_retry_after:
+                self._backoff_seconds = max(self._backoff_seconds, self.last_retry_after)
+            self._backoff_until = time.time() + self._backoff_seconds
+            logger.warning(f"NewsAPI rate limit hit during prefetch; next attempt in {self._backoff_seconds}s")
+        else:
+            self._backoff_seconds = 0
+            self._backoff_until = 0
+        return True
+    
+    def _fetch_live_articles(self, page_size):
         """Fetch niche tech news from NewsAPI using multiple targeted searches"""
         if not self.api_key:
             logger.error("NEWS_API_KEY not found in environment variables")
             raise Exception("NEWS_API_KEY not configured")
         
-        # Define specific keyword combinations for targeted searches
-        keyword_searches = [
-            '"AR development" OR "augmented reality development"',
-            '"VR development" OR "virtual reality development"', 
-            '"Unity 3D" OR "Unity engine" OR "Unity development"',
-            '"Blender 3D" OR "Blender modeling" OR "Blender tutorial"',
-            '"Meta Quest" OR "Oculus Quest" OR "VR headset"',
-            '"3D modeling" OR "3D design" OR "3D graphics"',
-            '"game development" OR "indie game" OR "game engine"',
-            '"graphics design" OR "3D artist" OR "digital art"'
-        ]
+        # Run the targeted searches concurrently; the rate limiter spaces out the calls.
+        # Results are merged in keyword order so dedup keeps a stable matchedKeyword.
+        raw_results = []
+        rate_limited = False
+        retry_after = None
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            futures = [
+                (search_query, executor.submit(self._search_keyword, search_query, page_size))
+                for search_query in self.keyword_searches
+            ]
+            for search_query, future in futures:
+                try:
+                    raw_results.append((search_query, future.result()))
+                except NewsAPIRateLimitError as e:
+                    rate_limited = True
+                    if e.retry_after:
+                        retry_after = max(retry_after or 0, e.retry_after)
+                    logger.warning(f"Rate limited searching for '{search_query}': {e}")
+                except Exception as e:
+                    logger.error(f"Error searching for '{search_query}': {e}")
+        self.last_fetch_rate_limited = rate_limited
+        self.last_retry_after = retry_after
         
-        all_articles = []
+        # Stream cleaned results through on-the-fly URL dedup into a bounded heap of the
+        # newest candidates; older results could never reach the displayed articles
+        candidates = self._iter_unique_articles(
+            article
+            for search_query, raw_articles in raw_results
+            for article in self._iter_cleaned_articles(search_query, raw_articles)
+        )
+        newest_articles = heapq.nlargest(
+            self.max_articles * self.dedup_candidate_factor,
+            candidates,
+            key=lambda article: article.published_at or ''
+        )
         
-        for search_query in keyword_searches:
-            try:
-                params = {
-                    'q': search_query,
-                    'language': 'en',
-                    'sortBy': 'publishedAt',
-                    'pageSize': page_size,
-                    'apiKey': self.api_key
-                }
-                
-                logger.info(f"Searching for: {search_query}")
-                response = requests.get(self.base_url, params=params, timeout=10)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    articles = data.get('articles', [])
-                    
-                    for article in articles:
-                        if (article.get('title') and 
-                            article.get('url') and 
-                            article.get('title') != '[Removed]' and
-                            article.get('description')):
-                            
-                            # Format the publication date nicely
-                            published_date = article.get('publishedAt', '')
-                            if published_date:
-                                try:
-                                    from datetime import datetime
-                                    dt = datetime.fromisoformat(published_date.replace('Z', '+00:00'))
-                                    formatted_date = dt.strftime('%Y-%m-%d %H:%M')
-                                except:
-                                    formatted_date = published_date[:10]
-                            else:
-                                formatted_date = 'Unknown'
-                            
-                            cleaned_article = {
-                                'title': article['title'],
-                                'description': article.get('description', ''),
-                                'url': article['url'],
-                                'urlToImage': article.get('urlToImage'),
-                                'publishedAt': article.get('publishedAt'),
-                                'formattedDate': formatted_date,
-                                'source': article.get('source', {}),
-                                'author': article.get('author'),
-                                'matchedKeyword': search_query
-                            }
-                            all_articles.append(cleaned_article)
-                            
-                else:
-                    logger.warning(f"Search failed for '{search_query}' with status {response.status_code}")
-                time.sleep(1)
-            except Exception as e:
-                logger.error(f"Error searching for '{search_query}': {e}")
-                continue
+        # Persist the batch and advance each search's high-water mark to what was stored;
+        # the store ignores URLs it has already seen
+        new_articles = self.store.save_articles(newest_articles)
+        logger.info(f"Kept {len(newest_articles)} newest unique articles ({len(new_articles)} new) from {len(self.keyword_searches)} keyword searches")
         
-        # Remove duplicates based on URL
-        seen_urls = set()
-        unique_articles = []
-        for article in all_articles:
-            if article['url'] not in seen_urls:
-                seen_urls.add(article['url'])
-                unique_articles.append(article)
-        
-        # Sort by publication date (newest first)
-        unique_articles.sort(key=lambda x: x.get('publishedAt', ''), reverse=True)
-        
-        logger.info(f"Fetched {len(unique_articles)} unique articles from {len(keyword_searches)} keyword searches")
-        if unique_articles:
-            return unique_articles[:20], False  # Live articles
+        # Serve the newest articles from the indexed store (sorted by publication date)
+        stored_articles = self._select_top_articles()
+        if stored_articles:
+            # Push only the new articles that made it into the snapshot
+            new_urls = {article.url for article in new_articles}
+            self.broadcaster.publish([article for article in stored_articles if article.url in new_urls])
+            return stored_articles, False  # Live articles
         else:
             fallback = self.load_fallback_articles()
             return fallback, True  # Fallback used
 
+    def _select_top_articles(self):
+        """Pick the newest stored articles, keeping one representative per near-duplicate cluster"""
+        # Rows are streamed from the store, so scanning stops once enough representatives are found
+        candidates = self.store.iter_recent_articles(limit=self.max_articles * self.dedup_candidate_factor)
+        detector = NearDuplicateDetector(threshold=self.dedup_threshold)
+        
+        selected = []
+        duplicates = 0
+        for article in candidates:
+            # Candidates are newest first, so the newest variant represents its cluster
+            if detector.check_and_add(article.url, f"{article.title} {article.description or ''}"):
+                duplicates += 1
+                continue
+            selected.append(article)
+            if len(selected) >= self.max_articles:
+                break
+        
+        if duplicates:
+            logger.info(f"Dropped {duplicates} near-duplicate articles")
+        return selected
+    
+    def _iter_unique_articles(self, articles):
+        """Yield articles whose URL has not been seen earlier in the stream"""
+        seen_urls = set()
+        for article in articles:
+            if article.url not in seen_urls:
+                seen_urls.add(article.url)
+                yield article
+    
+    def _iter_cleaned_articles(self, search_query, raw_articles):
+        """Lazily filter raw NewsAPI results and yield them as Article records"""
+        for article in raw_articles:
+            if (article.get('title') and 
+                article.get('url') and 
+                article.get('title') != '[Removed]' and
+                article.get('description')):
+                
+                # formattedDate is derived lazily, so discarded results never parse their date
+                yield Article(
+                    title=article['title'],
+                    description=article.get('description', ''),
+                    url=article['url'],
+                    url_to_image=article.get('urlToImage'),
+                    published_at=article.get('publishedAt'),
+                    source=article.get('source', {}),
+                    author=article.get('author'),
+                    matched_keyword=search_query
+                )
+    
+    def _search_keyword(self, search_query, page_size):
+        """Run a single NewsAPI search and return its raw articles"""
+        params = {
+            'q': search_query,
+            'language': 'en',
+            'sortBy': 'publishedAt',
+            'pageSize': page_size,
+            'apiKey': self.api_key
+        }
+        
+        # Only ask for articles newer than the last one stored for this search
+        high_water_mark = self.store.get_high_water_mark(search_query)
+        if high_water_mark:
+            params['from'] = high_water_mark
+        
+        self.rate_limiter.acquire()
+        logger.info(f"Searching for: {search_query}")
+        response = get_session().get(self.base_url, params=params, timeout=10)
+        
+        if response.status_code == 429:
+            retry_after = response.headers.get('Retry-After')
+            raise NewsAPIRateLimitError(
+                f"NewsAPI returned 429 for '{search_query}'",
+                retry_after=int(retry_after) if retry_after and retry_after.isdigit() else None
+            )
+        if response.status_code != 200:
+            logger.warning(f"Search failed for '{search_query}' with status {response.status_code}")
+            return []
+        
+        # The high-water mark only advances once save_articles has committed the results
+        return response.json().get('articles', [])
+
     
     def format_article_for_email(self, article, index):
         """Format a single article for email content"""
         title = article.get('title', 'No Title')
         url = article.get('url', '')
-        source = article.get('source', {}).get('name', 'Unknown Source')
+        source = (article.get('source') or {}).get('name', 'Unknown Source')
         
         formatted = f"{index}. {title}\n"
         formatted += f"   Source: {source}\n"
@@ -154,7 +409,7 @@ class NewsService:
         fallback_path = os.path.join(os.path.dirname(__file__), "fallback_articles.json")
         try:
             with open(fallback_path, "r", encoding="utf-8") as f:
-                articles = json.load(f)
+                articles = [Article.from_dict(article) for article in json.load(f)]
                 logger.warning("Loaded fallback articles due to NewsAPI failure.")
                 return articles
         except Exception as e:
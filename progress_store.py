@@ -0,0 +1,320 @@
+import os
+import json
+import sqlite3
+import logging
+import threading
+import copy
+from abc import ABC, abstractmethod
+from xp_ledger import apply_entry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_USER_ID = "default"
+
+SCALAR_FIELDS = ("total_xp", "articles_read", "summaries_generated", "daily_streak", "last_active", "created_date")
+
+class ProgressStore(ABC):
+    """Interface for per-user gamification progress backends"""
+
+    @abstractmethod
+    def load(self, user_id):
+        """Return the user's progress dict, or None for an unknown user"""
+
+    @abstractmethod
+    def update(self, user_id, mutate, default):
+        """Atomically apply mutate(user_data) to the user's progress and persist it.
+
+        mutate returns (result, ledger_entries): the entries are appended to the XP ledger and
+        must already be folded into user_data. default() builds the progress dict for a new
+        user. Returns result.
+        """
+
+    @abstractmethod
+    def get_version(self, user_id):
+        """Return a value that changes whenever the user's progress changes"""
+
+class SQLiteProgressStore(ProgressStore):
+    """SQLite progress store: an append-only XP ledger plus per-user snapshot rows.
+
+    A user's progress is their snapshot rows with the ledger entries after snapshot_seq
+    replayed on top; the snapshot is re-materialized every snapshot_interval entries.
+    """
+
+    def __init__(self, db_path=None, snapshot_interval=None):
+        self.db_path = db_path or os.getenv("PROGRESS_DB_PATH", "progress.db")
+        self.snapshot_interval = snapshot_interval or int(os.getenv("PROGRESS_SNAPSHOT_INTERVAL", "50"))
+        self._local = threading.local()
+        self._init_db()
+
+    def _connect(self):
+        """Return this thread's connection in autocommit mode, so transactions are explicit"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_db(self):
+        """Create tables if they do not exist yet"""
+        conn = self._connect()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS user_progress (
+                user_id TEXT PRIMARY KEY,
+                total_xp INTEGER NOT NULL DEFAULT 0,
+                articles_read INTEGER NOT NULL DEFAULT 0,
+                summaries_generated INTEGER NOT NULL DEFAULT 0,
+                daily_streak INTEGER NOT NULL DEFAULT 0,
+                last_active TEXT,
+                created_date TEXT,
+                version INTEGER NOT NULL DEFAULT 0,
+                snapshot_seq INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS user_topics (
+                user_id TEXT NOT NULL,
+                topic TEXT NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, topic)
+            );
+            CREATE TABLE IF NOT EXISTS user_achievements (
+                user_id TEXT NOT NULL,
+                achievement_id TEXT NOT NULL,
+                PRIMARY KEY (user_id, achievement_id)
+            );
+            CREATE TABLE IF NOT EXISTS user_paths (
+                user_id TEXT NOT NULL,
+                path_id TEXT NOT NULL,
+                current_level INTEGER NOT NULL DEFAULT 1,
+                xp INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, path_id)
+            );
+            CREATE TABLE IF NOT EXISTS xp_ledger (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                activity TEXT NOT NULL,
+                amount INTEGER NOT NULL,
+                topic TEXT,
+                achievement_id TEXT,
+                occurred_at TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_xp_ledger_user_seq ON xp_ledger (user_id, seq);
+        """)
+        # Databases created before the ledger existed have no snapshot_seq column
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(user_progress)")}
+        if "snapshot_seq" not in columns:
+            conn.execute("ALTER TABLE user_progress ADD COLUMN snapshot_seq INTEGER NOT NULL DEFAULT 0")
+
+    def load(self, user_id):
+        """Return the user's current progress: snapshot plus replayed ledger tail"""
+        conn = self._connect()
+        # One read transaction, so a concurrent snapshot write cannot land between the
+        # snapshot rows and the tail and have its entries replayed twice
+        conn.execute("BEGIN")
+        try:
+            snapshot, snapshot_seq = self._load_snapshot(conn, user_id)
+            tail = self._read_ledger(user_id, snapshot_seq) if snapshot is not None else []
+        finally:
+            conn.execute("COMMIT")
+        if snapshot is None:
+            return None
+        for entry in tail:
+            apply_entry(snapshot, entry)
+        return snapshot
+
+    def _load_snapshot(self, conn, user_id):
+        """Assemble the user's snapshot dict from their rows; returns (snapshot, snapshot_seq)"""
+        row = conn.execute("SELECT * FROM user_progress WHERE user_id = ?", (user_id,)).fetchone()
+        if row is None:
+            return None, 0
+
+        user_data = {field: row[field] for field in SCALAR_FIELDS}
+        # rowid order keeps topics and achievements in the order they were first recorded
+        topics = conn.execute(
+            "SELECT topic, count FROM user_topics WHERE user_id = ? ORDER BY rowid", (user_id,)
+        ).fetchall()
+        user_data["topics_discovered"] = [topic["topic"] for topic in topics]
+        user_data["topic_counts"] = {topic["topic"]: topic["count"] for topic in topics if topic["count"]}
+        user_data["achievements_unlocked"] = [
+            achievement["achievement_id"] for achievement in conn.execute(
+                "SELECT achievement_id FROM user_achievements WHERE user_id = ? ORDER BY rowid", (user_id,)
+            )
+        ]
+        user_data["learning_paths"] = {
+            path["path_id"]: {"current_level": path["current_level"], "xp": path["xp"]}
+            for path in conn.execute(
+                "SELECT path_id, current_level, xp FROM user_paths WHERE user_id = ?", (user_id,)
+            )
+        }
+        return user_data, row["snapshot_seq"]
+
+    def update(self, user_id, mutate, default):
+        """Apply mutate to one user's progress and append its ledger entries, under a write lock shared by all processes"""
+        conn = self._connect()
+        # BEGIN IMMEDIATE takes the write lock up front, so concurrent workers serialize
+        # instead of overwriting each other's read-modify-write
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            snapshot, snapshot_seq = self._load_snapshot(conn, user_id)
+            force_snapshot = snapshot is None
+            if snapshot is None:
+                conn.execute("INSERT INTO user_progress (user_id) VALUES (?)", (user_id,))
+                snapshot = {"topics_discovered": [], "topic_counts": {}, "achievements_unlocked": [], "learning_paths": {}}
+                user_data = default()
+            else:
+                user_data = copy.deepcopy(snapshot)
+
+            tail = self._read_ledger(user_id, snapshot_seq)
+            for entry in tail:
+                apply_entry(user_data, entry)
+
+            replayed = copy.deepcopy(user_data)
+            result, entries = mutate(user_data)
+
+            last_seq = tail[-1]["seq"] if tail else snapshot_seq
+            for entry in entries:
+                apply_entry(replayed, entry)
+                cursor = conn.execute(
+                    """INSERT INTO xp_ledger (user_id, activity, amount, topic, achievement_id, occurred_at)
+                       VALUES (?, ?, ?, ?, ?, ?)""",
+                    (user_id, entry["activity"], entry["amount"], entry.get("topic"),
+                     entry.get("achievement_id"), entry["occurred_at"])
+                )
+                last_seq = cursor.lastrowid
+
+            # Changes the ledger cannot replay (new users, replaced progress, level bookkeeping)
+            # are captured by materializing a snapshot right away
+            if force_snapshot or replayed != user_data or len(tail) + len(entries) >= self.snapshot_interval:
+                self._write_snapshot(conn, user_id, snapshot, user_data, last_seq)
+            else:
+                conn.execute("UPDATE user_progress SET version = version + 1 WHERE user_id = ?", (user_id,))
+            conn.execute("COMMIT")
+            return result
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _read_ledger(self, user_id, after_seq=0):
+        """Return the user's ledger entries newer than after_seq, oldest first"""
+        rows = self._connect().execute(
+            """SELECT seq, activity, amount, topic, achievement_id, occurred_at FROM xp_ledger
+               WHERE user_id = ? AND seq > ? ORDER BY seq""",
+            (user_id, after_seq)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def _write_snapshot(self, conn, user_id, before, after, snapshot_seq):
+        """Materialize the user's progress as of snapshot_seq, writing only the rows that changed"""
+        conn.execute(
+            f"""UPDATE user_progress SET {", ".join(f"{field} = ?" for field in SCALAR_FIELDS)},
+                    version = version + 1, snapshot_seq = ?
+                WHERE user_id = ?""",
+            [after.get(field) for field in SCALAR_FIELDS] + [snapshot_seq, user_id]
+        )
+
+        topic_counts = after.get("topic_counts") or {}
+        topics = list(after.get("topics_discovered") or [])
+        topics += [topic for topic in topic_counts if topic not in topics]
+        for topic in topics:
+            count = topic_counts.get(topic, 0)
+            if topic not in before["topics_discovered"] or count != before["topic_counts"].get(topic, 0):
+                conn.execute(
+                    """INSERT INTO user_topics (user_id, topic, count) VALUES (?, ?, ?)
+                       ON CONFLICT(user_id, topic) DO UPDATE SET count = excluded.count""",
+                    (user_id, topic, count)
+                )
+
+        for achievement_id in after.get("achievements_unlocked") or []:
+            if achievement_id not in before["achievements_unlocked"]:
+                conn.execute(
+                    "INSERT OR IGNORE INTO user_achievements (user_id, achievement_id) VALUES (?, ?)",
+                    (user_id, achievement_id)
+                )
+
+        for path_id, path_data in (after.get("learning_paths") or {}).items():
+            if path_data != before["learning_paths"].get(path_id):
+                conn.execute(
+                    """INSERT INTO user_paths (user_id, path_id, current_level, xp) VALUES (?, ?, ?, ?)
+                       ON CONFLICT(user_id, path_id) DO UPDATE SET
+                           current_level = excluded.current_level, xp = excluded.xp""",
+                    (user_id, path_id, path_data["current_level"], path_data["xp"])
+                )
+
+    def get_version(self, user_id):
+        """Per-user update counter"""
+        row = self._connect().execute(
+            "SELECT version FROM user_progress WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def import_legacy_file(self, path, user_id=DEFAULT_USER_ID):
+        """One-time import of the old single-user user_progress.json"""
+        if not os.path.exists(path) or self.load(user_id) is not None:
+            return False
+        try:
+            with open(path, 'r') as f:
+                legacy = json.load(f)
+        except Exception as e:
+            logger.error(f"Error reading legacy progress file: {e}")
+            return False
+
+        def replace(user_data):
+            user_data.clear()
+            user_data.update(legacy)
+            return None, []
+
+        self.update(user_id, replace, lambda: {})
+        logger.info(f"Imported {path} as progress for user '{user_id}'; set PROGRESS_SINGLE_USER=1 to keep using it")
+        return True
+
+class JsonFileProgressStore(ProgressStore):
+    """Single-process JSON file backend ({user_id: progress} plus a ledger list); kept for simple local setups"""
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv("PROGRESS_JSON_PATH", "user_progress.json")
+        self._lock = threading.Lock()
+        self._versions = {}
+
+    def _read_all(self):
+        if not os.path.exists(self.path):
+            return {"users": {}, "ledger": []}
+        with open(self.path, 'r') as f:
+            data = json.load(f)
+        # The legacy file holds one user's progress at the top level
+        if "total_xp" in data:
+            return {"users": {DEFAULT_USER_ID: data}, "ledger": []}
+        return data
+
+    def load(self, user_id):
+        with self._lock:
+            return self._read_all()["users"].get(user_id)
+
+    def update(self, user_id, mutate, default):
+        with self._lock:
+            data = self._read_all()
+            user_data = data["users"].get(user_id) or default()
+            result, entries = mutate(user_data)
+            data["users"][user_id] = user_data
+            for entry in entries:
+                data["ledger"].append(dict(entry, user_id=user_id, seq=len(data["ledger"]) + 1))
+            # Write to a temporary file and swap it in so readers never see a partial file
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, 'w') as f:
+                json.dump(data, f)
+            os.replace(temp_path, self.path)
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            return result
+
+    def get_version(self, user_id):
+        with self._lock:
+            return self._versions.get(user_id, 0)
+
+def create_progress_store():
+    """Build the progress backend selected by PROGRESS_BACKEND ("sqlite" or "json")"""
+    backend = os.getenv("PROGRESS_BACKEND", "sqlite").lower()
+    if backend == "json":
+        return JsonFileProgressStore()
+    store = SQLiteProgressStore()
+    store.import_legacy_file(os.getenv("PROGRESS_JSON_PATH", "user_progress.json"))
+    return store
@@ -0,0 +1,38 @@
+import os
+from flask import render_template, session
+from markupsafe import Markup
+from cache_utils import LRUCache
+
+class RenderCache:
+    """Rendered HTML for whole pages and template fragments, keyed by the versions of their inputs"""
+
+    def __init__(self, maxsize=None):
+        maxsize = maxsize or int(os.getenv("RENDER_CACHE_SIZE", "64"))
+        self.pages = LRUCache(maxsize=maxsize)
+        self.fragments = LRUCache(maxsize=maxsize)
+
+    def render_page(self, key, build):
+        """Return the cached page for key, or call build() -> (html, cacheable) and keep the result.
+
+        Pages are bypassed while flash messages are pending, since base.html renders them.
+        """
+        if '_flashes' in session:
+            html, _ = build()
+            return html
+
+        html = self.pages.get(key)
+        if html is None:
+            html, cacheable = build()
+            # Flashes raised while building belong to this response only
+            if cacheable and '_flashes' not in session:
+                self.pages.set(key, html)
+        return html
+
+    def fragment(self, name, version, template_name, **context):
+        """Render a partial template once per (name, version); exposed to templates as cached_fragment"""
+        key = (name, version)
+        html = self.fragments.get(key)
+        if html is None:
+            html = Markup(render_template(template_name, **context))
+            self.fragments.set(key, html)
+        return html
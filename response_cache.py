@@ -0,0 +1,104 @@
+import os
+import gzip
+import json
+import hashlib
+from datetime import datetime, timezone
+from flask import Response
+from cache_utils import LRUCache
+
+# Optional fast paths: orjson for encoding, brotli for compression
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+def _json_default(o):
+    """Serialize objects exposing to_dict(), such as Article records"""
+    if hasattr(o, 'to_dict'):
+        return o.to_dict()
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+def encode_json(payload):
+    """Encode a payload to compact JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(payload, default=_json_default)
+    return json.dumps(payload, default=_json_default, separators=(',', ':')).encode('utf-8')
+
+class EncodedPayload:
+    """JSON body encoded once, with its validators and lazily compressed variants"""
+
+    __slots__ = ('body', 'etag', 'last_modified', '_compressed')
+
+    def __init__(self, body, last_modified=None):
+        self.body = body
+        self.etag = hashlib.sha1(body).hexdigest()
+        self.last_modified = datetime.fromtimestamp(last_modified, timezone.utc) if last_modified else None
+        self._compressed = {}
+
+    def compressed(self, encoding):
+        """Return the body compressed with 'br' or 'gzip', computing it on first use"""
+        data = self._compressed.get(encoding)
+        if data is None:
+            if encoding == 'br':
+                data = brotli.compress(self.body, quality=5)
+            else:
+                data = gzip.compress(self.body, compresslevel=6)
+            self._compressed[encoding] = data
+        return data
+
+class SerializedResponseCache:
+    """Pre-serialized JSON responses keyed by the version of the data they were built from"""
+
+    def __init__(self, maxsize=None, min_compress_size=None):
+        self.entries = LRUCache(maxsize=maxsize or int(os.getenv("API_RESPONSE_CACHE_SIZE", "16")))
+        self.min_compress_size = min_compress_size or int(os.getenv("API_COMPRESS_MIN_BYTES", "1024"))
+
+    def get_or_build(self, key, version, build, last_modified=None):
+        """Return the encoded payload for key at version, calling build() only when it changed.
+
+        build() returns (payload, cacheable); uncacheable payloads are encoded for this response only.
+        """
+        cached = self.entries.get(key)
+        if cached and cached[0] == version:
+            return cached[1]
+
+        payload, cacheable = build()
+        encoded = EncodedPayload(encode_json(payload), last_modified)
+        if cacheable:
+            self.entries.set(key, (version, encoded))
+        return encoded
+
+    def make_response(self, encoded, request):
+        """Build a response answering conditional requests with 304 and compressing large bodies"""
+        response = Response(encoded.body, mimetype='application/json')
+        response.set_etag(encoded.etag, weak=True)
+        if encoded.last_modified:
+            response.last_modified = encoded.last_modified
+        response.headers['Cache-Control'] = 'no-cache'
+        response.vary.add('Accept-Encoding')
+
+        response.make_conditional(request)
+        if response.status_code == 304:
+            return response
+
+        encoding = self._choose_encoding(encoded, request)
+        if encoding:
+            response.set_data(encoded.compressed(encoding))
+            response.headers['Content-Encoding'] = encoding
+        return response
+
+    def _choose_encoding(self, encoded, request):
+        """Pick brotli or gzip from Accept-Encoding for bodies worth compressing"""
+        if len(encoded.body) < self.min_compress_size:
+            return None
+        accepted = request.accept_encodings
+        if brotli is not None and accepted['br']:
+            return 'br'
+        if accepted['gzip']:
+            return 'gzip'
+        return None
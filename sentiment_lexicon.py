@@ -0,0 +1,82 @@
+import re
+
+# Word weights in roughly [-3, 3]; tuned for technology and industry news
+SENTIMENT_LEXICON = {
+    # positive
+    'launch': 1.0, 'launches': 1.0, 'launched': 1.0, 'release': 0.8, 'releases': 0.8, 'released': 0.8,
+    'new': 0.4, 'improve': 1.5, 'improves': 1.5, 'improved': 1.5, 'improvement': 1.5, 'improvements': 1.5,
+    'boost': 1.5, 'boosts': 1.5, 'growth': 1.5, 'grow': 1.2, 'grows': 1.2, 'gain': 1.2, 'gains': 1.2,
+    'success': 2.0, 'successful': 2.0, 'win': 1.8, 'wins': 1.8, 'award': 1.8, 'best': 1.8,
+    'innovative': 2.0, 'innovation': 1.8, 'breakthrough': 2.5, 'powerful': 1.5, 'impressive': 2.2,
+    'exciting': 2.5, 'excited': 2.5, 'amazing': 2.8, 'stunning': 2.5, 'record': 1.2, 'free': 0.8,
+    'easy': 1.2, 'faster': 1.3, 'better': 1.5, 'upgrade': 1.2, 'upgrades': 1.2, 'support': 0.6,
+    'partnership': 1.2, 'partners': 0.8, 'expands': 1.2, 'expand': 1.0, 'popular': 1.3, 'love': 2.2,
+    'accessible': 1.2, 'immersive': 1.0, 'seamless': 1.5, 'surge': 1.5, 'soars': 2.0, 'milestone': 1.8,
+    # negative
+    'layoff': -2.5, 'layoffs': -2.5, 'cut': -1.2, 'cuts': -1.2, 'shutdown': -2.5, 'shuts': -2.0,
+    'cancel': -1.8, 'canceled': -1.8, 'cancelled': -1.8, 'delay': -1.3, 'delayed': -1.3, 'delays': -1.3,
+    'lawsuit': -2.0, 'sued': -2.0, 'fine': -0.8, 'fined': -2.0, 'ban': -1.8, 'banned': -1.8,
+    'bug': -1.3, 'bugs': -1.3, 'crash': -2.0, 'crashes': -2.0, 'broken': -2.0, 'fail': -2.0,
+    'fails': -2.0, 'failed': -2.0, 'failure': -2.2, 'loss': -1.8, 'losses': -1.8, 'decline': -1.5,
+    'declines': -1.5, 'drop': -1.3, 'drops': -1.3, 'slump': -2.0, 'struggle': -1.5, 'struggles': -1.5,
+    'problem': -1.5, 'problems': -1.5, 'issue': -0.8, 'issues': -0.8, 'vulnerability': -2.0,
+    'breach': -2.5, 'hack': -2.0, 'hacked': -2.2, 'backlash': -2.0, 'controversy': -1.8, 'worst': -2.5,
+    'disappointing': -2.2, 'expensive': -1.0, 'dead': -2.0, 'dies': -2.0, 'killed': -2.0,
+    # cautious
+    'risk': -0.8, 'risks': -0.8, 'concern': -1.0, 'concerns': -1.0, 'uncertain': -1.0,
+    'uncertainty': -1.0, 'warning': -1.2, 'warns': -1.2, 'challenge': -0.5, 'challenges': -0.5,
+    'questions': -0.5, 'skeptical': -1.2, 'slow': -0.8, 'slows': -1.0
+}
+
+NEGATIONS = {'not', 'no', 'never', "isn't", "aren't", "wasn't", "don't", "doesn't", "didn't", "won't", "can't", 'without'}
+
+INTENSIFIERS = {'very': 1.3, 'extremely': 1.5, 'hugely': 1.5, 'massive': 1.3, 'major': 1.2, 'huge': 1.3, 'slightly': 0.6}
+
+TOKEN_PATTERN = re.compile(r"[a-z]+(?:'[a-z]+)?")
+
+class LexiconSentimentAnalyzer:
+    """Offline lexicon- and rule-based sentiment scorer for article batches"""
+
+    def __init__(self, lexicon=None, negations=None, intensifiers=None):
+        self.lexicon = lexicon or SENTIMENT_LEXICON
+        self.negations = negations or NEGATIONS
+        self.intensifiers = intensifiers or INTENSIFIERS
+
+    def score_text(self, text):
+        """Return a sentiment score in [-1, 1] for a piece of text"""
+        total = 0.0
+        tokens = TOKEN_PATTERN.findall((text or '').lower())
+        for i, token in enumerate(tokens):
+            weight = self.lexicon.get(token)
+            if weight is None:
+                continue
+            # Look back up to three tokens for negations and intensifiers
+            for previous in tokens[max(0, i - 3):i]:
+                if previous in self.negations:
+                    weight *= -0.7
+                elif previous in self.intensifiers:
+                    weight *= self.intensifiers[previous]
+            total += weight
+        # Normalize the raw sum into [-1, 1]
+        return total / (total * total + 15) ** 0.5
+
+    def score_articles(self, articles):
+        """Score a batch of articles; returns a list of {'score', 'label'} in input order"""
+        results = []
+        for article in articles:
+            score = self.score_text(f"{article.get('title') or ''}. {article.get('description') or ''}")
+            results.append({'score': round(score, 3), 'label': self.label_for(score)})
+        return results
+
+    @staticmethod
+    def label_for(score):
+        """Map a score to one of the mood labels used by MoodService"""
+        if score >= 0.5:
+            return 'excited'
+        if score >= 0.15:
+            return 'positive'
+        if score <= -0.4:
+            return 'negative'
+        if score <= -0.1:
+            return 'cautious'
+        return 'neutral'
@@ -206,7 +206,9 @@ function getIconForType(type) {
 // API helper functions
 async function fetchArticles() {
     try {
-        const response = await fetch('/api/articles');
+        // Revalidate with the stored ETag; an unchanged snapshot comes back as 304
+        // and the browser serves the cached body instead of re-downloading it
+        const response = await fetch('/api/articles', { cache: 'no-cache' });
         const data = await response.json();
         return data;
     } catch (error) {
@@ -215,8 +217,25 @@ async function fetchArticles() {
     }
 }
 
+// Receive newly ingested articles pushed by the server instead of polling
+function subscribeToArticles(onArticles) {
+    if (!window.EventSource) {
+        return null;
+    }
+    const source = new EventSource('/api/articles/stream');
+    source.addEventListener('articles', (event) => {
+        try {
+            onArticles(JSON.parse(event.data).articles);
+        } catch (error) {
+            console.error('Error reading article stream:', error);
+        }
+    });
+    return source;
+}
+
 // Export functions for use in templates
 window.NewsApp = {
     showToast,
-    fetchArticles
+    fetchArticles,
+    subscribeToArticles
 };
@@ -1,15 +1,61 @@
 import os
 import logging
-import requests
 import re
 import google.generativeai as genai
 import google.generativeai as genai 
+from http_client import get_session
+from summary_cache import SummaryCache
+from text_matching import VocabularyMatcher
 
 logger = logging.getLogger(__name__)
 
+# Bump whenever the summary prompt changes so cached summaries are not reused
+SUMMARY_PROMPT_VERSION = "v1"
+
+# Entity vocabulary for extract_key_info: {group: {label: [surface terms]}}
+ENTITY_VOCABULARY = {
+    'companies': {
+        'NVIDIA': ['NVIDIA'], 'Google': ['Google'], 'Meta': ['Meta'], 'Apple': ['Apple'],
+        'Microsoft': ['Microsoft'], 'Unity': ['Unity'], 'Epic': ['Epic'], 'Unreal': ['Unreal'],
+        'Blender': ['Blender'], 'OpenAI': ['OpenAI'], 'AMD': ['AMD'], 'Intel': ['Intel']
+    },
+    'technologies': {
+        'AR': ['AR'], 'VR': ['VR'], 'XR': ['XR'], 'AI': ['AI'], 'GPU': ['GPU'], '3D': ['3D'],
+        'metaverse': ['metaverse'], 'gaming': ['gaming'], 'blockchain': ['blockchain'], 'NFT': ['NFT']
+    }
+}
+
+# Cue words the fallback summary branches on, matched on whole words in one pass
+FALLBACK_CUE_VOCABULARY = {
+    'cues': {
+        'nvidia': ['nvidia'],
+        'stock': ['stock', 'stocks'],
+        'holdings': ['holdings', 'holding'],
+        'accessibility': ['accessibility'],
+        'accessible': ['accessible'],
+        'ar': ['ar', 'augmented reality'],
+        'lens': ['lens', 'lenses'],
+        'maps': ['maps'],
+        'case study': ['case study'],
+        'filing': ['filing', 'filings'],
+        'securities': ['securities'],
+        'institutional investor': ['institutional investor', 'institutional investors'],
+        'challenges': ['challenges', 'challenge'],
+        'lessons': ['lessons', 'lesson']
+    }
+}
+
+# Section headers the batch prompt asks Gemini to emit, e.g. "### ARTICLE 3"
+BATCH_SECTION_PATTERN = re.compile(r'^\s*#{2,3}\s*ARTICLE\s+(\d+)\s*:?\s*$', re.IGNORECASE | re.MULTILINE)
+
 class SummarizerService:
-    def __init__(self):
+    def __init__(self, entity_vocabulary=None, cue_vocabulary=None):
         genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+        self.entity_matcher = VocabularyMatcher(entity_vocabulary or ENTITY_VOCABULARY, capture_numbers=True)
+        self.cue_matcher = VocabularyMatcher(cue_vocabulary or FALLBACK_CUE_VOCABULARY)
+        self.model = genai.GenerativeModel("gemini-1.5-flash")
+        self.summary_cache = SummaryCache()
+        self.batch_size = int(os.getenv("SUMMARY_BATCH_SIZE", "20"))
     
     def fetch_article_content(self, url):
         """Fetch article content from URL"""
@@ -17,7 +63,7 @@ class SummarizerService:
             headers = {
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
             }
-            response = requests.get(url, headers=headers, timeout=10)
+            response = get_session().get(url, headers=headers, timeout=10)
             response.raise_for_status()
             return response.text
         except Exception as e:
@@ -29,19 +75,13 @@ class SummarizerService:
         if not text:
             return {}
         
-        # Extract companies
-        companies = re.findall(r'\b(?:NVIDIA|Google|Meta|Apple|Microsoft|Unity|Epic|Unreal|Blender|OpenAI|AMD|Intel)\b', text, re.IGNORECASE)
-        
-        # Extract numbers and percentages
-        numbers = re.findall(r'\d+(?:\.\d+)?%?', text)
-        
-        # Extract technologies
-        technologies = re.findall(r'\b(?:AR|VR|XR|AI|GPU|3D|metaverse|gaming|blockchain|NFT)\b', text, re.IGNORECASE)
+        # Companies, technologies, numbers and percentages in a single pass
+        found = self.entity_matcher.scan(text)
         
         return {
-            'companies': list(set(companies)),
-            'numbers': numbers[:3],  # First 3 numbers
-            'technologies': list(set(technologies))
+            'companies': found.get('companies', []),
+            'numbers': found['numbers'][:3],  # First 3 numbers
+            'technologies': found.get('technologies', [])
         }
 
     def generate_fallback_summary(self, article_data):
@@ -57,21 +97,22 @@ class SummarizerService:
         summary_points = []
         
         # Point 1: Main topic based on specific title content
-        title_lower = title.lower()
-        desc_lower = description.lower() if description else ''
+        # Cue words found in the title and description, each scanned once
+        title_cues = self.cue_matcher.labels(title, 'cues')
+        desc_cues = self.cue_matcher.labels(description, 'cues')
         
         # More specific analysis based on actual content
-        if 'nvidia' in title_lower:
-            if 'stock' in title_lower or 'holdings' in title_lower:
+        if 'nvidia' in title_cues:
+            if 'stock' in title_cues or 'holdings' in title_cues:
                 summary_points.append("1. Reports on NVIDIA stock performance and institutional investment changes")
             else:
                 summary_points.append("1. Discusses NVIDIA's developments in AI and GPU technology")
-        elif 'accessibility' in title_lower or 'accessible' in title_lower:
-            if 'ar' in title_lower or 'lens' in title_lower:
+        elif 'accessibility' in title_cues or 'accessible' in title_cues:
+            if 'ar' in title_cues or 'lens' in title_cues:
                 summary_points.append("1. Focuses on making AR technology accessible to visually impaired users")
             else:
                 summary_points.append("1. Addresses accessibility improvements in technology design")
-        elif 'lens' in title_lower and 'maps' in title_lower:
+        elif 'lens' in title_cues and 'maps' in title_cues:
             summary_points.append("1. Examines AR integration in Google Maps through the Lens feature")
         elif key_info['companies']:
             summary_points.append(f"1. Covers developments at {', '.join(key_info['companies'][:2])}")
@@ -88,11 +129,11 @@ class SummarizerService:
                 # Extract specific numbers or percentages
                 if key_info['numbers']:
                     summary_points.append(f"2. Reports specific metrics: {', '.join(key_info['numbers'][:2])}")
-                elif 'filing' in desc_lower and 'securities' in desc_lower:
+                elif 'filing' in desc_cues and 'securities' in desc_cues:
                     summary_points.append("2. Based on official SEC filing and financial disclosure documents")
-                elif 'institutional investor' in desc_lower:
+                elif 'institutional investor' in desc_cues:
                     summary_points.append("2. Analyzes institutional investment patterns and market confidence")
-                elif 'case study' in title_lower:
+                elif 'case study' in title_cues:
                     summary_points.append("2. Presents detailed case study with practical implementation insights")
                 else:
                     # Extract first sentence or meaningful chunk
@@ -104,11 +145,11 @@ class SummarizerService:
             summary_points.append("2. Provides industry insights and technical analysis")
         
         # Point 3: Professional relevance based on content
-        if 'nvidia' in title_lower and 'stock' in title_lower:
+        if 'nvidia' in title_cues and 'stock' in title_cues:
             summary_points.append("3. Important for investors tracking AI and semiconductor market leaders")
-        elif 'accessibility' in title_lower:
+        elif 'accessibility' in title_cues:
             summary_points.append("3. Valuable for UX designers creating inclusive AR/VR experiences")
-        elif 'lens' in title_lower and 'maps' in title_lower:
+        elif 'lens' in title_cues and 'maps' in title_cues:
             summary_points.append("3. Relevant for AR developers working on navigation applications")
         elif key_info['technologies']:
             tech_list = ', '.join(key_info['technologies'][:2])
@@ -117,13 +158,13 @@ class SummarizerService:
             summary_points.append("3. Relevant for professionals in XR/AR/VR and gaming industries")
         
         # Point 4: Market/Industry impact
-        if 'stock' in title_lower or 'holdings' in title_lower:
+        if 'stock' in title_cues or 'holdings' in title_cues:
             summary_points.append("4. Indicates continued institutional confidence in tech sector growth")
-        elif 'accessibility' in title_lower:
+        elif 'accessibility' in title_cues:
             summary_points.append("4. Demonstrates commitment to inclusive technology development")
-        elif 'challenges' in desc_lower:
+        elif 'challenges' in desc_cues:
             summary_points.append("4. Addresses key industry challenges and potential solutions")
-        elif 'lessons' in desc_lower:
+        elif 'lessons' in desc_cues:
             summary_points.append("4. Shares valuable lessons from real-world implementation")
         else:
             summary_points.append("4. Discusses impact on future technology adoption and user experience")
@@ -135,25 +176,20 @@ class SummarizerService:
 
     def summarize_article(self, article_data):
         """Generate 5 key takeaways from an article using Gemini AI Pro"""
+        cache_key = self.summary_cache.make_key(article_data, SUMMARY_PROMPT_VERSION)
+        cached_summary = self.summary_cache.get(cache_key)
+        if cached_summary:
+            return cached_summary
+        
         try:
-            # Use article description and title for summarization
-            content = f"Title: {article_data.get('title', '')}\n"
-            content += f"Description: {article_data.get('description', '')}\n"
-            content += f"Source: {article_data.get('source', {}).get('name', '')}"
+            prompt = self._build_summary_prompt(article_data)
             
-            prompt = f"""You are an expert tech news summarizer. Extract exactly 5 key takeaways from the given article. 
-            Format as a numbered list with concise, actionable points. Focus on the most important information for XR/AR/VR/gaming professionals.
-            
-            Please provide 5 key takeaways from this article:
-            
-            {content}"""
-            
-            # Using Gemini 2.5 Flash for fast, efficient summarization
-            model = genai.GenerativeModel("gemini-1.5-flash")  # Use the latest available
-            response = model.generate_content(prompt)
-
+            # Using Gemini Flash for fast, efficient summarization
+            response = self.model.generate_content(prompt)
             
             summary = response.text.strip() if response.text else ""
+            if summary:
+                self.summary_cache.set(cache_key, summary)
             return summary
             
         except Exception as e:
@@ -161,6 +197,114 @@ class SummarizerService:
             # Return fallback summary instead of error message
             return self.generate_fallback_summary(article_data)
     
+    def stream_summary(self, article_data):
+        """Yield the 5 key takeaways for an article as Gemini generates them"""
+        cache_key = self.summary_cache.make_key(article_data, SUMMARY_PROMPT_VERSION)
+        cached_summary = self.summary_cache.get(cache_key)
+        if cached_summary:
+            yield cached_summary
+            return
+        
+        chunks = []
+        try:
+            response = self.model.generate_content(self._build_summary_prompt(article_data), stream=True)
+            for chunk in response:
+                text = chunk.text
+                if text:
+                    chunks.append(text)
+                    yield text
+        except Exception as e:
+            logger.error(f"Error streaming summary from Gemini: {e}")
+            if not chunks:
+                yield self.generate_fallback_summary(article_data)
+            return
+        
+        summary = "".join(chunks).strip()
+        if summary:
+            self.summary_cache.set(cache_key, summary)
+        else:
+            yield self.generate_fallback_summary(article_data)
+    
+    def summarize_articles(self, articles):
+        """Generate 5 key takeaways for each article, packing cache misses into batched Gemini calls"""
+        summaries = [None] * len(articles)
+        misses = []
+        
+        for index, article_data in enumerate(articles):
+            cache_key = self.summary_cache.make_key(article_data, SUMMARY_PROMPT_VERSION)
+            cached_summary = self.summary_cache.get(cache_key)
+            if cached_summary:
+                summaries[index] = cached_summary
+            else:
+                misses.append((index, article_data, cache_key))
+        
+        for start in range(0, len(misses), self.batch_size):
+            batch = misses[start:start + self.batch_size]
+            try:
+                parsed = self._summarize_batch([article_data for _, article_data, _ in batch])
+            except Exception as e:
+                logger.error(f"Error batch summarizing {len(batch)} articles with Gemini: {e}")
+                parsed = {}
+            
+            for position, (index, article_data, cache_key) in enumerate(batch, 1):
+                summary = parsed.get(position)
+                if summary:
+                    self.summary_cache.set(cache_key, summary)
+                    summaries[index] = summary
+                else:
+                    summaries[index] = self.generate_fallback_summary(article_data)
+        
+        logger.info(f"Summarized {len(articles)} articles ({len(misses)} uncached)")
+        return summaries
+    
+    def _summarize_batch(self, articles):
+        """Summarize several articles in one Gemini call and return {position: summary}"""
+        sections = []
+        for position, article_data in enumerate(articles, 1):
+            sections.append(f"### ARTICLE {position}\n{self._format_article_content(article_data)}")
+        
+        prompt = f"""You are an expert tech news summarizer. Extract exactly 5 key takeaways from each of the given articles. 
+        Format each as a numbered list with concise, actionable points. Focus on the most important information for XR/AR/VR/gaming professionals.
+        
+        Answer with one section per article, in the same order, each starting with its header line exactly as given
+        (for example "### ARTICLE 1") followed by the 5 numbered takeaways. Do not add any other text.
+        
+        {chr(10).join(sections)}"""
+        
+        response = self.model.generate_content(prompt)
+        return self._parse_batch_response(response.text or "", len(articles))
+    
+    def _parse_batch_response(self, text, expected_count):
+        """Split a batched Gemini answer into per-article summaries keyed by 1-based position"""
+        matches = list(BATCH_SECTION_PATTERN.finditer(text))
+        parsed = {}
+        for i, match in enumerate(matches):
+            position = int(match.group(1))
+            end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+            summary = text[match.end():end].strip()
+            if 1 <= position <= expected_count and summary and position not in parsed:
+                parsed[position] = summary
+        return parsed
+    
+    def _build_summary_prompt(self, article_data):
+        """Build the single-article summary prompt"""
+        # Use article description and title for summarization
+        content = self._format_article_content(article_data)
+        
+        return f"""You are an expert tech news summarizer. Extract exactly 5 key takeaways from the given article. 
+            Format as a numbered list with concise, actionable points. Focus on the most important information for XR/AR/VR/gaming professionals.
+            
+            Please provide 5 key takeaways from this article:
+            
+            {content}"""
+    
+    def _format_article_content(self, article_data):
+        """Format the article fields sent to Gemini"""
+        content = f"Title: {article_data.get('title', '')}\n"
+        content += f"Description: {article_data.get('description', '')}\n"
+        content += f"Source: {(article_data.get('source') or {}).get('name', '')}"
+        return content
+    
     def get_article_summary(self, article_url, article_data):
         """Get summary for an article using URL and metadata"""
         try:
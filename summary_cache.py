@@ -0,0 +1,81 @@
+import os
+import hashlib
+import sqlite3
+import logging
+import threading
+import time
+from cache_utils import LRUCache
+
+logger = logging.getLogger(__name__)
+
+class SummaryCache:
+    """Two-tier summary cache: in-memory LRU in front of an optional SQLite file"""
+
+    def __init__(self, maxsize=None, db_path=None):
+        self.memory = LRUCache(maxsize=maxsize or int(os.getenv("SUMMARY_CACHE_SIZE", "512")))
+        self.db_path = db_path if db_path is not None else os.getenv("SUMMARY_CACHE_PATH", "")
+        self._local = threading.local()
+        if self.db_path:
+            self._init_db()
+
+    @staticmethod
+    def make_key(article_data, prompt_version):
+        """Hash the fields that determine a summary into a stable cache key"""
+        parts = [
+            prompt_version,
+            article_data.get('title') or '',
+            article_data.get('description') or '',
+            (article_data.get('source') or {}).get('name') or ''
+        ]
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Return a cached summary from memory, then disk, or None"""
+        summary = self.memory.get(key)
+        if summary is not None or not self.db_path:
+            return summary
+        try:
+            row = self._connect().execute("SELECT summary FROM summaries WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Error reading summary cache: {e}")
+            return None
+        if row:
+            self.memory.set(key, row[0])
+            return row[0]
+        return None
+
+    def set(self, key, summary):
+        """Store a summary in memory and, when configured, on disk"""
+        self.memory.set(key, summary)
+        if not self.db_path:
+            return
+        try:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO summaries (key, summary, created_at) VALUES (?, ?, ?)",
+                    (key, summary, time.time())
+                )
+        except sqlite3.Error as e:
+            logger.error(f"Error writing summary cache: {e}")
+
+    def _connect(self):
+        """Return this thread's connection to the persistent tier"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_db(self):
+        """Create the summaries table if it does not exist yet"""
+        conn = self._connect()
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS summaries (
+                    key TEXT PRIMARY KEY,
+                    summary TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
@@ -0,0 +1,54 @@
+import re
+
+NUMBER_PATTERN = r'\d+(?:\.\d+)?%?'
+
+class VocabularyMatcher:
+    """Precompiled, case-insensitive multi-term matcher with word-boundary semantics"""
+
+    def __init__(self, vocabulary, capture_numbers=False):
+        # vocabulary is plain data: {group: {label: [surface terms]}}. Every term is compiled
+        # into one alternation (longest first) so a single pass finds all groups' labels.
+        self.vocabulary = vocabulary
+        self.capture_numbers = capture_numbers
+        self._lookup = {}
+        for group, labels in vocabulary.items():
+            for label, terms in labels.items():
+                for term in terms:
+                    targets = self._lookup.setdefault(term.lower(), [])
+                    if (group, label) not in targets:
+                        targets.append((group, label))
+
+        # A longer term hides the shorter terms inside it ("unity engine" vs "unity"),
+        # so let it also report the labels of every whole-word sub-term it contains
+        for term, targets in self._lookup.items():
+            for other, other_targets in self._lookup.items():
+                if other != term and re.search(rf'(?<!\w){re.escape(other)}(?!\w)', term):
+                    targets.extend(t for t in other_targets if t not in targets)
+
+        alternation = "|".join(re.escape(term) for term in sorted(self._lookup, key=len, reverse=True))
+        pattern = rf'(?<!\w)(?P<term>{alternation})(?!\w)' if alternation else r'(?!x)x'
+        if capture_numbers:
+            pattern += rf'|(?P<number>{NUMBER_PATTERN})'
+        self.pattern = re.compile(pattern, re.IGNORECASE)
+
+    def scan(self, text):
+        """Return {group: [labels in order of first match]}, plus 'numbers' when enabled"""
+        found = {group: [] for group in self.vocabulary}
+        seen = set()
+        numbers = []
+        for match in self.pattern.finditer(text or ''):
+            term = match.group('term')
+            if term is None:
+                numbers.append(match.group('number'))
+                continue
+            for group, label in self._lookup[term.lower()]:
+                if (group, label) not in seen:
+                    seen.add((group, label))
+                    found[group].append(label)
+        if self.capture_numbers:
+            found['numbers'] = numbers
+        return found
+
+    def labels(self, text, group):
+        """Return the set of labels from one group found in text"""
+        return set(self.scan(text)[group])
@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta
+
+def make_entry(activity, amount, occurred_at=None, topic=None, achievement_id=None):
+    """Build one XP ledger entry"""
+    return {
+        "activity": activity,
+        "amount": amount,
+        "topic": topic,
+        "achievement_id": achievement_id,
+        "occurred_at": occurred_at or datetime.now().isoformat()
+    }
+
+def apply_entry(user_data, entry):
+    """Fold one ledger entry into a progress dict.
+
+    This is the only place counters change, so replaying a snapshot plus the ledger
+    tail reproduces exactly the state built up live.
+    """
+    user_data["total_xp"] += entry["amount"]
+    activity = entry["activity"]
+
+    if activity == "article_read":
+        user_data["articles_read"] += 1
+
+        # Daily streak follows when the read happened
+        today = datetime.fromisoformat(entry["occurred_at"]).date()
+        last_active = user_data.get("last_active")
+        if last_active:
+            last_date = datetime.fromisoformat(last_active).date()
+            if today == last_date:
+                pass  # Same day, no change
+            elif today == last_date + timedelta(days=1):
+                user_data["daily_streak"] += 1
+            else:
+                user_data["daily_streak"] = 1  # Reset streak
+        else:
+            user_data["daily_streak"] = 1
+        user_data["last_active"] = entry["occurred_at"]
+
+        topic = entry.get("topic")
+        if topic:
+            topic_counts = user_data.setdefault("topic_counts", {})
+            topic_counts[topic] = topic_counts.get(topic, 0) + 1
+            if topic not in user_data["topics_discovered"]:
+                user_data["topics_discovered"].append(topic)
+
+    elif activity == "summary_generated":
+        user_data["summaries_generated"] += 1
+
+    elif activity == "achievement":
+        if entry["achievement_id"] not in user_data["achievements_unlocked"]:
+            user_data["achievements_unlocked"].append(entry["achievement_id"])